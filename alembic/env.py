@@ -10,7 +10,8 @@ from bot.db.engine import Base
 from bot.db.models import *  # noqa: F401,F403
 
 config = context.config
-if config.config_file_name is not None:
+# Not when run by the bot: fileConfig would replace its logging setup
+if config.config_file_name is not None and "connection" not in config.attributes:
     fileConfig(config.config_file_name)
 
 target_metadata = Base.metadata
@@ -46,7 +47,12 @@ async def run_async_migrations() -> None:
 
 
 def run_migrations_online() -> None:
-    asyncio.run(run_async_migrations())
+    # The bot passes its own connection (bot.db.bootstrap); the CLI connects by alembic.ini
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+    else:
+        asyncio.run(run_async_migrations())
 
 
 if context.is_offline_mode():
@@ -0,0 +1,48 @@
+"""users: is_blocked, blocked_at, ix_users_is_blocked, ix_users_vip_expiry
+
+Revision ID: 3f2a9c1d7e4b
+Revises:
+Create Date: 2026-10-19 12:00:00
+
+Databases created before these columns existed have a `users` table that
+create_all will not alter. Fresh databases get them from create_all (which
+runs first), so every step checks the live table and only adds what is missing.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f2a9c1d7e4b"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("users"):
+        return
+    columns = {c["name"] for c in inspector.get_columns("users")}
+    indexes = {i["name"] for i in inspector.get_indexes("users")}
+
+    if "is_blocked" not in columns:
+        op.add_column(
+            "users",
+            sa.Column("is_blocked", sa.Boolean(), nullable=False, server_default="0"),
+        )
+    if "blocked_at" not in columns:
+        op.add_column("users", sa.Column("blocked_at", sa.DateTime(), nullable=True))
+    if "ix_users_is_blocked" not in indexes:
+        op.create_index("ix_users_is_blocked", "users", ["is_blocked"])
+    if "ix_users_vip_expiry" not in indexes:
+        op.create_index("ix_users_vip_expiry", "users", ["is_vip", "vip_until"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_vip_expiry", table_name="users")
+    op.drop_index("ix_users_is_blocked", table_name="users")
+    op.drop_column("users", "blocked_at")
+    op.drop_column("users", "is_blocked")
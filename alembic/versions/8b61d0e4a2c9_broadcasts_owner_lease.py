@@ -0,0 +1,37 @@
+"""broadcasts: owner, lease_until
+
+Revision ID: 8b61d0e4a2c9
+Revises: 3f2a9c1d7e4b
+Create Date: 2026-10-19 14:00:00
+
+Broadcasts are claimed by one process at a time. Only adds the columns the
+live table lacks: create_all runs first and already has them on fresh databases.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b61d0e4a2c9"
+down_revision: Union[str, None] = "3f2a9c1d7e4b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("broadcasts"):
+        return
+    columns = {c["name"] for c in inspector.get_columns("broadcasts")}
+
+    if "owner" not in columns:
+        op.add_column("broadcasts", sa.Column("owner", sa.String(64), nullable=True))
+    if "lease_until" not in columns:
+        op.add_column("broadcasts", sa.Column("lease_until", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("broadcasts", "lease_until")
+    op.drop_column("broadcasts", "owner")
@@ -0,0 +1,74 @@
+"""
+Cold start benchmark.
+
+Starts a fresh interpreter per run and times the startup phases that need
+neither Telegram nor (by default) MySQL: imports, config, engine creation
+and dispatcher/router setup. `--db` adds the schema check and cache
+warm-up against the MySQL from .env. Prints the median of each phase, the
+whole process wall time, and where import time goes (-X importtime).
+
+    python -m benchmarks.cold_start [runs] [--db]
+"""
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _child(with_db: bool) -> None:
+    """Runs in the fresh interpreter; prints the phase timeline as JSON."""
+    from bot.startup_timeline import timeline
+    import bot.main as bot_main
+    from bot.config import load_config
+    from bot.db.engine import create_engine, create_session_pool
+    from bot.storage import create_storage
+    from bot.startup import prepare
+
+    config = load_config()
+    timeline.mark("config")
+    engine = create_engine(config.db.url, config.db.pool_size, config.db.max_overflow)
+    session_pool = create_session_pool(engine)
+    timeline.mark("engine")
+    if with_db:
+        asyncio.run(prepare(engine, session_pool, prewarm_connections=config.db.prewarm))
+    bot_main.create_dispatcher(config, create_storage(config, session_pool), session_pool)
+    timeline.mark("dispatcher + routers")
+    print(json.dumps(timeline.phases))
+
+
+def main(runs: int = 10, with_db: bool = False) -> None:
+    from bot.startup_timeline import import_report, measure_imports
+
+    command = [sys.executable, "-m", "benchmarks.cold_start", "--child"] + (["--db"] if with_db else [])
+    phases: dict[str, list[float]] = {}
+    walls = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        walls.append(time.perf_counter() - started)
+        for phase, seconds in json.loads(output.splitlines()[-1]):
+            phases.setdefault(phase, []).append(seconds)
+
+    print(f"{'phase':<28} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for phase, timings in phases.items():
+        print(
+            f"{phase:<28} {statistics.median(timings) * 1000:>10.1f} "
+            f"{min(timings) * 1000:>8.1f} {max(timings) * 1000:>8.1f}"
+        )
+    print(
+        f"{'process wall time':<28} {statistics.median(walls) * 1000:>10.1f} "
+        f"{min(walls) * 1000:>8.1f} {max(walls) * 1000:>8.1f}"
+    )
+    print()
+    print(import_report(asyncio.run(measure_imports())))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--child" in args:
+        _child("--db" in args)
+    else:
+        numbers = [int(a) for a in args if a.isdigit()]
+        main(numbers[0] if numbers else 10, "--db" in args)
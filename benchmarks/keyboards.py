@@ -0,0 +1,86 @@
+"""
+Keyboard memoization benchmark.
+
+Compares building each keyboard from scratch (the undecorated function)
+with the memoized call, and shows the serialization cost that remains per
+send. Allocation is measured with tracemalloc.
+
+    python -m benchmarks.keyboards
+"""
+import json
+import timeit
+import tracemalloc
+
+from bot.keyboards import inline
+
+INTERESTS = tuple((f"Интерес {i}", "🎯") for i in range(16))
+PLANS = [
+    (1, "1 день", 15, 1, None, "⭐"),
+    (2, "7 дней", 150, 7, None, "⭐"),
+    (3, "1 месяц", 250, 30, "(-60%)", "⭐"),
+    (4, "12 месяцев", 400, 365, None, "🎉"),
+]
+ROOMS = [(i, f"Комната {i}", "🏠", None) for i in range(7)]
+
+CASES = [
+    ("main_menu_keyboard", inline.main_menu_keyboard, inline.main_menu_keyboard.__wrapped__, ()),
+    ("age_keyboard", inline.age_keyboard, inline.age_keyboard.__wrapped__, ()),
+    ("pref_age_keyboard", inline.pref_age_keyboard, inline.pref_age_keyboard.__wrapped__, ()),
+    ("top_keyboard", inline.top_keyboard, inline.top_keyboard.__wrapped__, ()),
+    (
+        "interests_keyboard",
+        inline.interests_keyboard,
+        lambda o, s: inline._interests_keyboard.__wrapped__(tuple(o), frozenset(s)),
+        (INTERESTS, ["Интерес 3", "Интерес 7"]),
+    ),
+    (
+        "vip_plans_keyboard",
+        inline.vip_plans_keyboard,
+        lambda p, w: inline._vip_plans_keyboard.__wrapped__(tuple(p), w),
+        (PLANS, None),
+    ),
+    (
+        "rooms_keyboard",
+        inline.rooms_keyboard,
+        lambda r: inline._rooms_keyboard.__wrapped__(tuple(r)),
+        (ROOMS,),
+    ),
+]
+
+
+def _per_call_us(fn, args, number: int) -> float:
+    return min(timeit.repeat(lambda: fn(*args), number=number, repeat=5)) / number * 1e6
+
+
+def _alloc_bytes(fn, args, number: int = 200) -> float:
+    fn(*args)  # warm caches
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    keep = [fn(*args) for _ in range(number)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del keep
+    return (after - before) / number
+
+
+def _serialize(markup) -> str:
+    # Roughly what the aiogram session does with reply_markup on every send
+    return json.dumps(markup.model_dump(warnings=False, exclude_none=True), ensure_ascii=False)
+
+
+def main(number: int = 2000) -> None:
+    print(f"{'keyboard':<20} {'build µs':>9} {'cached µs':>10} {'build B':>9} {'cached B':>9} {'serialize µs':>13}")
+    for name, cached, raw, args in CASES:
+        markup = cached(*args)
+        print(
+            f"{name:<20} "
+            f"{_per_call_us(raw, args, number):>9.2f} "
+            f"{_per_call_us(cached, args, number):>10.2f} "
+            f"{_alloc_bytes(raw, args):>9.0f} "
+            f"{_alloc_bytes(cached, args):>9.0f} "
+            f"{_per_call_us(_serialize, (markup,), number):>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
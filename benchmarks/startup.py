@@ -0,0 +1,89 @@
+"""
+Startup time benchmark.
+
+Times the database part of startup against the MySQL from .env, each run
+with a fresh engine as after a restart:
+
+- legacy: create_all, COUNT-then-insert seeding, caches loaded one by one
+  (what main() did before the schema_meta markers);
+- cold:   bot.startup.prepare() with the markers cleared (first deploy of
+  a new schema or seed version);
+- warm:   bot.startup.prepare() on an up-to-date database (a plain restart).
+
+Needs a database it may create tables and seed rows in.
+
+    python -m benchmarks.startup [runs]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from sqlalchemy import delete, func, select
+
+from bot.config import load_config
+from bot.db.engine import Base, create_engine, create_session_pool
+from bot.db.models import InterestOption, Room, SchemaMeta, VipPlan
+from bot.db.repositories import UserRepo
+from bot.services.catalog import catalog
+from bot.services.leaderboard import leaderboard
+from bot.services.reachability import reachability
+from bot.services.vip_expiry import vip_expiry
+from bot.startup import prepare
+
+
+async def _legacy(engine, session_pool) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with session_pool() as session:
+        for model in (InterestOption, VipPlan, Room):
+            await session.execute(select(func.count()).select_from(model))
+    async with session_pool() as session:
+        await UserRepo(session).deactivate_expired_vip()
+        await session.commit()
+        await vip_expiry.load(session)
+        await catalog.reload(session)
+        await leaderboard.refresh(session)
+        await reachability.load(session)
+
+
+async def _clear_markers(session_pool) -> None:
+    async with session_pool() as session:
+        await session.execute(delete(SchemaMeta))
+        await session.commit()
+
+
+async def _time(mode: str, runs: int) -> list[float]:
+    config = load_config()
+    timings = []
+    for _ in range(runs):
+        engine = create_engine(config.db.url, config.db.pool_size, config.db.max_overflow)
+        session_pool = create_session_pool(engine)
+        if mode == "cold":
+            await _clear_markers(session_pool)
+            # The clear used a connection; start from an empty pool again
+            await engine.dispose()
+        started = time.perf_counter()
+        if mode == "legacy":
+            await _legacy(engine, session_pool)
+        else:
+            await prepare(engine, session_pool, prewarm_connections=config.db.prewarm)
+        timings.append(time.perf_counter() - started)
+        await engine.dispose()
+    return timings
+
+
+async def main(runs: int = 5) -> None:
+    # One untimed pass so every table and marker exists
+    await _time("cold", 1)
+    print(f"{'mode':<8} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for mode in ("legacy", "cold", "warm"):
+        timings = await _time(mode, runs)
+        print(
+            f"{mode:<8} {statistics.median(timings) * 1000:>10.1f} "
+            f"{min(timings) * 1000:>8.1f} {max(timings) * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import os
 from dotenv import load_dotenv
 
@@ -12,6 +12,16 @@ class DbConfig:
     user: str
     password: str
     name: str
+    pool_size: int = 20
+    max_overflow: int = 10
+    # Connections opened at startup, before the first update needs one
+    prewarm: int = 5
+    slow_query_ms: float = 200
+    slow_checkout_ms: float = 100
+    # Debug/profiling: count statements per update, warn over budget and on repeats
+    query_profile: bool = False
+    query_budget: int = 10
+    query_repeat_threshold: int = 3
 
     @property
     def url(self) -> str:
@@ -21,11 +31,81 @@ class DbConfig:
         )
 
 
+@dataclass
+class RedisConfig:
+    host: str = "localhost"
+    port: int = 6379
+    db: int = 0
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/{self.db}"
+
+
+@dataclass
+class FsmConfig:
+    # memory | mysql | redis
+    backend: str = "memory"
+    # Seconds an untouched FSM state/data is kept
+    ttl: int = 86400
+    # Most keys the memory backend holds before evicting the least recently used
+    max_size: int = 100_000
+
+
+@dataclass
+class WebhookConfig:
+    enabled: bool = False
+    # Public base URL; when empty the server runs but setWebhook is not called
+    url: str = ""
+    path: str = "/webhook"
+    host: str = "0.0.0.0"
+    port: int = 8080
+    # X-Telegram-Bot-Api-Secret-Token; required when enabled (see webhook.check_config)
+    secret: str = ""
+    max_in_flight: int = 100
+    max_connections: int = 40
+
+
+@dataclass
+class MetricsConfig:
+    # 0 disables the /metrics endpoint
+    port: int = 9090
+    # Loopback by default: the metrics are not meant to be public
+    host: str = "127.0.0.1"
+
+
+@dataclass
+class LoggingConfig:
+    level: str = "INFO"
+    # json | text
+    format: str = "json"
+    # Share of INFO/DEBUG records kept per logger: "aiogram.event=0.1,bot.services.chat=0.1"
+    sample: str = ""
+
+
 @dataclass
 class Config:
     bot_token: str
     bot_username: str
     db: DbConfig
+    vip_expiry_notify: bool = False
+    broadcast_rate: float = 25
+    broadcast_concurrency: int = 10
+    album_delay: float = 0.5
+    user_mailbox_depth: int = 50
+    # DB connections kept out of update admission for background tasks
+    admission_reserve: int = 4
+    webhook: WebhookConfig = field(default_factory=WebhookConfig)
+    redis: RedisConfig = field(default_factory=RedisConfig)
+    fsm: FsmConfig = field(default_factory=FsmConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    logging: LoggingConfig = field(default_factory=LoggingConfig)
+    # Event loop lag sampling period and the stall length worth a warning; 0 disables
+    loop_monitor_interval: float = 0.1
+    loop_stall_threshold: float = 0.2
+    # Deadline shared by in-flight updates, albums and broadcasts on shutdown. Flushing
+    # takes up to 10s more: keep the sum under the container's stop grace period
+    shutdown_timeout: float = 15
 
 
 def load_config() -> Config:
@@ -38,5 +118,51 @@ def load_config() -> Config:
             user=os.getenv("DB_USER", "root"),
             password=os.getenv("DB_PASSWORD", ""),
             name=os.getenv("DB_NAME", "anonim_chat"),
+            pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            prewarm=int(os.getenv("DB_PREWARM", "5")),
+            slow_query_ms=float(os.getenv("DB_SLOW_QUERY_MS", "200")),
+            slow_checkout_ms=float(os.getenv("DB_SLOW_CHECKOUT_MS", "100")),
+            query_profile=os.getenv("DB_QUERY_PROFILE", "0") == "1",
+            query_budget=int(os.getenv("DB_QUERY_BUDGET", "10")),
+            query_repeat_threshold=int(os.getenv("DB_QUERY_REPEAT_THRESHOLD", "3")),
+        ),
+        vip_expiry_notify=os.getenv("VIP_EXPIRY_NOTIFY", "0") == "1",
+        broadcast_rate=float(os.getenv("BROADCAST_RATE", "25")),
+        broadcast_concurrency=int(os.getenv("BROADCAST_CONCURRENCY", "10")),
+        album_delay=int(os.getenv("ALBUM_DELAY_MS", "500")) / 1000,
+        user_mailbox_depth=int(os.getenv("USER_MAILBOX_DEPTH", "50")),
+        admission_reserve=int(os.getenv("ADMISSION_RESERVE", "4")),
+        webhook=WebhookConfig(
+            enabled=os.getenv("BOT_MODE", "polling") == "webhook",
+            url=os.getenv("WEBHOOK_URL", ""),
+            path=os.getenv("WEBHOOK_PATH", "/webhook"),
+            host=os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+            port=int(os.getenv("WEBHOOK_PORT", "8080")),
+            secret=os.getenv("WEBHOOK_SECRET", ""),
+            max_in_flight=int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", "100")),
+            max_connections=int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40")),
+        ),
+        redis=RedisConfig(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", "6379")),
+            db=int(os.getenv("REDIS_DB", "0")),
+        ),
+        fsm=FsmConfig(
+            backend=os.getenv("FSM_STORAGE", "memory"),
+            ttl=int(os.getenv("FSM_TTL", "86400")),
+            max_size=int(os.getenv("FSM_MAX_SIZE", "100000")),
+        ),
+        loop_monitor_interval=int(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100")) / 1000,
+        loop_stall_threshold=int(os.getenv("LOOP_STALL_MS", "200")) / 1000,
+        shutdown_timeout=float(os.getenv("SHUTDOWN_TIMEOUT", "15")),
+        metrics=MetricsConfig(
+            port=int(os.getenv("METRICS_PORT", "9090")),
+            host=os.getenv("METRICS_HOST", "127.0.0.1"),
+        ),
+        logging=LoggingConfig(
+            level=os.getenv("LOG_LEVEL", "INFO"),
+            format=os.getenv("LOG_FORMAT", "json"),
+            sample=os.getenv("LOG_SAMPLE", "aiogram.event=0.1,bot.services.chat=0.1"),
         ),
     )
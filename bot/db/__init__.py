@@ -1,7 +1,8 @@
 from bot.db.engine import create_engine, create_session_pool, Base
 from bot.db.models import (
     User, Chat, SearchQueue, Rating, Referral, UserInterest,
-    InterestOption, VipPlan, Room, MessageLog,
+    InterestOption, VipPlan, Room, MessageLog, UserDailyStat, Broadcast,
+    FsmRecord,
 )
 
 __all__ = [
@@ -18,4 +19,7 @@ __all__ = [
     "VipPlan",
     "Room",
     "MessageLog",
+    "UserDailyStat",
+    "Broadcast",
+    "FsmRecord",
 ]
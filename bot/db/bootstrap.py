@@ -0,0 +1,150 @@
+"""
+Startup schema and seed checks that cost one query on a warm boot.
+
+`schema_meta` holds a fingerprint of the models' DDL and the seed version
+the database was last brought up to. When both match, startup skips
+create_all (which reflects every table) and seeding altogether. Otherwise
+Alembic migrations run if the project has any, else create_all, and the
+catalog seeds run; then the markers are updated. The schema marker is only
+written after the live tables were checked against the models, so a column
+that no migration adds is reported on every boot instead of being hidden.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from pathlib import Path
+
+from sqlalchemy import Connection, inspect, text
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from bot.db.engine import Base
+from bot.db.repositories import InterestRepo, RoomRepo, SchemaMetaRepo, VipPlanRepo
+from bot.startup_timeline import timeline
+
+logger = logging.getLogger(__name__)
+
+# Bump when the default catalogs (interests, rooms, VIP plans) change
+SEED_VERSION = "1"
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+ALEMBIC_VERSIONS = ALEMBIC_INI.parent / "alembic" / "versions"
+
+
+def schema_fingerprint() -> str:
+    """
+    Hash of the MySQL DDL of every model and of the migration file names:
+    changes whenever a table, column or index does, or a migration is added.
+    """
+    dialect = mysql.dialect()
+    ddl = []
+    for table in Base.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            ddl.append(str(CreateIndex(index).compile(dialect=dialect)))
+    ddl += sorted(path.name for path in ALEMBIC_VERSIONS.glob("*.py"))
+    return hashlib.sha256("\n".join(ddl).encode()).hexdigest()[:32]
+
+
+def missing_schema(connection: Connection) -> list[str]:
+    """Tables, columns and named indexes of the models that the live database lacks."""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            missing.append(table.name)
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        missing += [f"{table.name}.{c.name}" for c in table.columns if c.name not in columns]
+        indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        missing += [f"{table.name}.{i.name}" for i in table.indexes if i.name not in indexes]
+    return missing
+
+
+def _has_migrations() -> bool:
+    return ALEMBIC_VERSIONS.is_dir() and any(ALEMBIC_VERSIONS.glob("*.py"))
+
+
+def _alembic_upgrade(connection: Connection) -> None:
+    from alembic import command
+    from alembic.config import Config as AlembicConfig
+
+    # On the bot's own connection: env.py picks it up instead of the alembic.ini URL
+    alembic_config = AlembicConfig(str(ALEMBIC_INI))
+    alembic_config.attributes["connection"] = connection
+    command.upgrade(alembic_config, "head")
+
+
+async def ensure_schema(
+    engine: AsyncEngine,
+    session_pool: async_sessionmaker[AsyncSession],
+) -> bool:
+    """Bring schema and seeds up to date if the markers say so. Returns True if anything ran."""
+    async with session_pool() as session:
+        markers = await SchemaMetaRepo(session).get_all()
+
+    fingerprint = schema_fingerprint()
+    schema_current = markers.get("schema") == fingerprint
+    schema_verified = schema_current
+    seed_current = markers.get("seed") == SEED_VERSION
+    timeline.mark("schema check")
+    if schema_current and seed_current:
+        return False
+
+    if not schema_current:
+        started = time.perf_counter()
+        async with engine.begin() as conn:
+            # Creates missing tables (checkfirst); migrations then alter the
+            # tables that already existed, which create_all never touches
+            await conn.run_sync(Base.metadata.create_all)
+            if _has_migrations():
+                await conn.run_sync(_alembic_upgrade)
+            # The marker is only stamped once the live schema really matches the models
+            missing = await conn.run_sync(missing_schema)
+        schema_verified = not missing
+        if missing:
+            logger.error(
+                f"Schema is behind the models, add a migration for: {', '.join(missing)}"
+            )
+        else:
+            logger.info(f"Schema brought up to date in {time.perf_counter() - started:.2f}s")
+        timeline.mark("schema")
+
+    async with session_pool() as session:
+        if not seed_current:
+            inserted = (
+                await InterestRepo(session).seed_defaults()
+                + await VipPlanRepo(session).seed_defaults()
+                + await RoomRepo(session).seed_defaults()
+            )
+            if inserted:
+                logger.info(f"Seeded {inserted} catalog row(s)")
+        meta = SchemaMetaRepo(session)
+        if schema_verified:
+            await meta.set("schema", fingerprint)
+        await meta.set("seed", SEED_VERSION)
+        await session.commit()
+    timeline.mark("seeding")
+    return True
+
+
+async def prewarm_pool(engine: AsyncEngine, connections: int) -> None:
+    """Open `connections` pooled connections at once so the first updates don't pay for the handshakes."""
+    if connections <= 0:
+        return
+    # Every ping holds its connection until all have one, so none is reused
+    barrier = asyncio.Barrier(connections)
+
+    async def ping() -> None:
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await barrier.wait()
+        except BaseException:
+            await barrier.abort()
+            raise
+
+    await asyncio.gather(*(ping() for _ in range(connections)))
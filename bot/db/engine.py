@@ -1,30 +1,66 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+
+from bot.db.instrumentation import InstrumentedPool, instrument
 
 
 class Base(DeclarativeBase):
     pass
 
 
-def create_engine(db_url: str) -> AsyncEngine:
-    return create_async_engine(
+class TrackedSession(Session):
+    """Session that knows whether its current transaction wrote anything."""
+
+    has_writes: bool = False
+
+
+@event.listens_for(TrackedSession, "do_orm_execute")
+def _on_execute(state) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.has_writes = True
+
+
+@event.listens_for(TrackedSession, "after_flush")
+def _on_flush(session, flush_context) -> None:
+    session.has_writes = True
+
+
+@event.listens_for(TrackedSession, "after_commit")
+@event.listens_for(TrackedSession, "after_rollback")
+def _on_transaction_end(session) -> None:
+    session.has_writes = False
+
+
+def create_engine(
+    db_url: str,
+    pool_size: int = 20,
+    max_overflow: int = 10,
+    slow_query_ms: float = 200,
+    slow_checkout_ms: float = 100,
+) -> AsyncEngine:
+    engine = create_async_engine(
         db_url,
         echo=False,
-        pool_size=20,
-        max_overflow=10,
+        poolclass=InstrumentedPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
         pool_recycle=3600,
         pool_pre_ping=True,
     )
+    instrument(engine.sync_engine, slow_query_ms=slow_query_ms, slow_checkout_ms=slow_checkout_ms)
+    return engine
 
 
 def create_session_pool(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
     return async_sessionmaker(
         bind=engine,
         class_=AsyncSession,
+        sync_session_class=TrackedSession,
         expire_on_commit=False,
     )
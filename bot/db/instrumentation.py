@@ -0,0 +1,157 @@
+import functools
+import hashlib
+import logging
+import re
+import sys
+import time
+from types import CodeType
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from bot.db import profiling
+from bot.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_checkout_seconds = registry.histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the pool, including opening overflow ones",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+_checkout_timeouts = registry.counter("db_pool_checkout_timeouts_total", "Pool checkouts that timed out")
+_pool_checked_out = registry.gauge("db_pool_checked_out", "Connections in use")
+_pool_overflow = registry.gauge("db_pool_overflow", "Connections open beyond pool_size")
+_pool_checked_in = registry.gauge("db_pool_checked_in", "Idle connections in the pool")
+_query_seconds = registry.histogram(
+    "db_query_seconds",
+    "Statement latency by calling repository method and statement fingerprint",
+    ("caller", "fingerprint"),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+_statements = registry.gauge(
+    "db_statement_info", "Normalized SQL of each statement fingerprint", ("fingerprint", "sql")
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_PARAM_LIST = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+_VALUES_ROWS = re.compile(r"(VALUES \(\.\.\.\))(?:, \(\.\.\.\))+")
+
+# Module-level state of the statement hook: fingerprints already exported as
+# db_statement_info, and the bot function (or None) each code object belongs to
+_exported: set[str] = set()
+_code_callers: dict[CodeType, str | None] = {}
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> tuple[str, str]:
+    """
+    (short hash, normalized SQL): literals become ?, IN lists and multi-row VALUES collapse.
+
+    Memoized by statement string: SQLAlchemy caches compiled statements, so
+    the same few hundred strings come back on every call.
+    """
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PARAM_LIST.sub("(...)", sql)
+    sql = _VALUES_ROWS.sub(r"\1", sql)
+    return hashlib.md5(sql.encode()).hexdigest()[:8], sql
+
+
+def _caller() -> str:
+    """
+    Innermost bot function (outside bot.db.engine/instrumentation) that led to this query.
+
+    Queries run in a greenlet spawned by the async engine; the awaiting
+    coroutines (handler -> repository -> AsyncSession.execute) are still on
+    the stack of the parent greenlet, so the walk continues there.
+    """
+    frame = sys._getframe(2)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            code = frame.f_code
+            try:
+                caller = _code_callers[code]
+            except KeyError:
+                module = frame.f_globals.get("__name__", "")
+                is_bot = module.startswith("bot.") and module not in ("bot.db.engine", __name__)
+                caller = _code_callers[code] = code.co_qualname if is_bot else None
+            if caller is not None:
+                return caller
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return "unknown"
+        frame = current.gr_frame
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that records how long every checkout waited.
+
+    The slow-checkout threshold is per pool: instrument() sets it on the
+    engine's pool, and recreate() (engine.dispose()) carries it over.
+    """
+
+    _slow_checkout_ms: float = 100
+
+    def recreate(self) -> "InstrumentedPool":
+        pool = super().recreate()
+        pool._slow_checkout_ms = self._slow_checkout_ms
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            _checkout_timeouts.inc()
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            _checkout_seconds.observe(waited)
+            if waited * 1000 >= self._slow_checkout_ms:
+                logger.warning(
+                    f"Slow pool checkout: {waited * 1000:.0f} ms "
+                    f"({self.checkedout()} in use, overflow {self.overflow()})"
+                )
+
+
+def instrument(engine: Engine, slow_query_ms: float = 200, slow_checkout_ms: float = 100) -> None:
+    """Attach pool gauges and per-statement timing to a (sync) engine."""
+    if isinstance(engine.pool, InstrumentedPool):
+        engine.pool._slow_checkout_ms = slow_checkout_ms
+    if isinstance(engine.pool, QueuePool):
+        # Read the live pool at render time; engine.pool changes on dispose()
+        _pool_checked_out.set_function(lambda: engine.pool.checkedout())
+        _pool_overflow.set_function(lambda: max(engine.pool.overflow(), 0))
+        _pool_checked_in.set_function(lambda: engine.pool.checkedin())
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        key, sql = fingerprint(statement)
+        caller = _caller()
+        if key not in _exported:
+            _exported.add(key)
+            _statements.set(1, fingerprint=key, sql=sql[:200])
+        _query_seconds.observe(elapsed, caller=caller, fingerprint=key)
+        profiling.record(key, sql, parameters, elapsed)
+        if elapsed * 1000 >= slow_query_ms:
+            logger.warning(f"Slow query {elapsed * 1000:.0f} ms in {caller} [{key}]: {sql[:500]}")
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        started = context.connection.info.get("query_started") if context.connection else None
+        if started:
+            started.pop()
@@ -35,6 +35,13 @@ class RatingValue(str, enum.Enum):
     DISLIKE = "dislike"
 
 
+class BroadcastStatus(str, enum.Enum):
+    RUNNING = "running"
+    PAUSED = "paused"
+    CANCELLED = "cancelled"
+    DONE = "done"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -65,6 +72,10 @@ class User(Base):
     # Registration
     is_registered: Mapped[bool] = mapped_column(Boolean, default=False, server_default="0")
 
+    # Delivery: set when Telegram reports the user unreachable (blocked the bot, deleted)
+    is_blocked: Mapped[bool] = mapped_column(Boolean, default=False, server_default="0")
+    blocked_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
     # Search preferences
     pref_gender: Mapped[GenderEnum | None] = mapped_column(Enum(GenderEnum), nullable=True)
     pref_age_min: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -89,6 +100,8 @@ class User(Base):
 
     __table_args__ = (
         Index("ix_users_is_registered", "is_registered"),
+        Index("ix_users_vip_expiry", "is_vip", "vip_until"),
+        Index("ix_users_is_blocked", "is_blocked"),
     )
 
 
@@ -174,6 +187,23 @@ class Rating(Base):
     )
 
 
+class UserDailyStat(Base):
+    """Per-user per-day counters for windowed leaderboards (written in batches)."""
+
+    __tablename__ = "user_daily_stats"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    telegram_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    karma_likes: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    karma_dislikes: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    messages_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_user_daily_stats_day_user", "day", "telegram_id", unique=True),
+    )
+
+
 class Referral(Base):
     __tablename__ = "referrals"
 
@@ -244,3 +274,63 @@ class Room(Base):
     description: Mapped[str | None] = mapped_column(String(500), nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, server_default="1")
     sort_order: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+
+class Broadcast(Base):
+    """Admin broadcast job: content reference, target filter and resume checkpoint."""
+
+    __tablename__ = "broadcasts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    status: Mapped[BroadcastStatus] = mapped_column(
+        Enum(BroadcastStatus), default=BroadcastStatus.RUNNING, nullable=False
+    )
+    # Content is copied from the admin's chat: one message id, or several for an album
+    from_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    message_ids: Mapped[str] = mapped_column(String(255), nullable=False)  # comma-separated
+    report_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    exclude_vip: Mapped[bool] = mapped_column(Boolean, default=False, server_default="0")
+    # All recipients with telegram_id <= checkpoint have been processed
+    last_telegram_id: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    sent_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    failed_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Process running the job; another may take it over once the lease has expired
+    owner: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    lease_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_broadcasts_status", "status"),
+    )
+
+
+class FsmRecord(Base):
+    """FSM state and data of one chat/user, shared by all bot processes."""
+
+    __tablename__ = "fsm_records"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    data: Mapped[str] = mapped_column(Text, nullable=False)  # JSON object
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_fsm_records_expires_at", "expires_at"),
+    )
+
+
+class SchemaMeta(Base):
+    """Version markers checked at startup (schema fingerprint, seed version)."""
+
+    __tablename__ = "schema_meta"
+
+    key: Mapped[str] = mapped_column(String(50), primary_key=True)
+    value: Mapped[str] = mapped_column(String(100), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
@@ -0,0 +1,146 @@
+"""
+Per-update SQL statement accounting.
+
+`track_queries()` opens a profile in a context variable; every statement
+executed inside it (instrumentation's cursor hook calls `record()`) counts
+towards it. The context follows the update's task into SQLAlchemy's worker
+greenlets, so concurrent updates never mix their counts. Outside a profile
+`record()` is a single context variable lookup.
+"""
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar["QueryProfile | None"] = ContextVar("query_profile", default=None)
+
+
+@dataclass
+class QueryProfile:
+    label: str = "unknown"
+    statements: int = 0
+    db_seconds: float = 0.0
+    # fingerprint -> executions, and (fingerprint, parameters) -> executions
+    fingerprints: Counter = field(default_factory=Counter)
+    identical: Counter = field(default_factory=Counter)
+    sql: dict[str, str] = field(default_factory=dict)
+
+    def duplicates(self) -> dict[str, int]:
+        """Fingerprints executed more than once with exactly the same parameters."""
+        repeated: dict[str, int] = {}
+        for (key, _), count in self.identical.items():
+            if count > 1:
+                repeated[key] = repeated.get(key, 0) + count - 1
+        return repeated
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Fingerprints run with `threshold`+ different parameter sets: likely a per-row loop."""
+        distinct = Counter(key for key, _ in self.identical)
+        return {key: count for key, count in distinct.items() if count >= threshold}
+
+
+def record(key: str, sql: str, parameters, elapsed: float) -> None:
+    profile = _current.get()
+    if profile is None:
+        return
+    profile.statements += 1
+    profile.db_seconds += elapsed
+    profile.fingerprints[key] += 1
+    profile.identical[key, repr(parameters)] += 1
+    profile.sql.setdefault(key, sql)
+
+
+@contextmanager
+def track_queries(label: str = "unknown") -> Iterator[QueryProfile]:
+    """
+    Count the statements run inside the block.
+
+        with track_queries() as profile:
+            await ChatService(bot, session).start_search(user)
+        assert profile.statements <= 6
+    """
+    profile = QueryProfile(label)
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+def current_profile() -> QueryProfile | None:
+    return _current.get()
+
+
+@dataclass
+class _HandlerStats:
+    updates: int = 0
+    statements: int = 0
+    max_statements: int = 0
+    db_seconds: float = 0.0
+    over_budget: int = 0
+    with_duplicates: int = 0
+
+
+class QueryReport:
+    """Per-handler totals of finished profiles, with budget and N+1 warnings."""
+
+    def __init__(self, budget: int = 10, repeat_threshold: int = 3):
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+        self._stats: dict[str, _HandlerStats] = {}
+
+    def add(self, profile: QueryProfile) -> None:
+        stats = self._stats.get(profile.label)
+        if stats is None:
+            stats = self._stats[profile.label] = _HandlerStats()
+        stats.updates += 1
+        stats.statements += profile.statements
+        stats.max_statements = max(stats.max_statements, profile.statements)
+        stats.db_seconds += profile.db_seconds
+
+        if profile.statements > self.budget:
+            stats.over_budget += 1
+            logger.warning(
+                f"{profile.label}: {profile.statements} statements "
+                f"(budget {self.budget}), {profile.db_seconds * 1000:.0f} ms in DB"
+            )
+        duplicates = profile.duplicates()
+        if duplicates:
+            stats.with_duplicates += 1
+            for key, extra in duplicates.items():
+                logger.warning(
+                    f"{profile.label}: identical statement repeated {extra}x [{key}]: "
+                    f"{profile.sql[key][:300]}"
+                )
+        for key, count in profile.repeated(self.repeat_threshold).items():
+            logger.warning(
+                f"{profile.label}: possible N+1, run with {count} parameter sets [{key}]: "
+                f"{profile.sql[key][:300]}"
+            )
+
+    def summary(self, limit: int = 20) -> str:
+        """Handlers with the most statements per update first."""
+        if not self._stats:
+            return "No profiled updates yet."
+        rows = sorted(
+            self._stats.items(),
+            key=lambda item: item[1].statements / item[1].updates,
+            reverse=True,
+        )[:limit]
+        lines = ["handler: updates, avg/max statements, avg DB ms, over budget, with duplicates"]
+        for label, s in rows:
+            lines.append(
+                f"{label}: {s.updates}, {s.statements / s.updates:.1f}/{s.max_statements}, "
+                f"{s.db_seconds / s.updates * 1000:.1f}, {s.over_budget}, {s.with_duplicates}"
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+
+query_report = QueryReport()
@@ -1,27 +1,52 @@
-from datetime import datetime
+from datetime import date, datetime
 
-from sqlalchemy import delete, func, select, update
+from sqlalchemy import delete, exists, func, insert, literal, select, union_all, update
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 _UNSET = object()
 
 from bot.db.models import (
+    Broadcast,
+    BroadcastStatus,
     Chat,
     ChatStatus,
+    FsmRecord,
     InterestOption,
     MessageLog,
     Rating,
     RatingValue,
     Referral,
     Room,
+    SchemaMeta,
     SearchQueue,
     User,
+    UserDailyStat,
     UserInterest,
     VipPlan,
 )
 
 
+async def _insert_if_empty(session: AsyncSession, model, columns: list[str], rows: list[tuple]) -> int:
+    """
+    Insert all `rows` in one INSERT ... SELECT that the database skips when
+    the table already has rows, so seeding is idempotent and never clobbers
+    catalogs edited by admins. Returns the number of rows inserted.
+    """
+    values = union_all(
+        *(select(*(literal(value).label(name) for name, value in zip(columns, row))) for row in rows)
+    ).subquery()
+    stmt = insert(model).from_select(
+        columns,
+        select(values).where(~exists().select_from(model)),
+        include_defaults=False,
+    )
+    result = await session.execute(stmt)
+    return result.rowcount
+
+
 class UserRepo:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -41,14 +66,50 @@ class UserRepo:
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def get_all_telegram_ids(self, exclude_vip: bool = False) -> list[int]:
-        """Get all registered user telegram_ids. If exclude_vip, skip VIP users."""
-        stmt = select(User.telegram_id).where(User.is_registered == True)
+    async def get_telegram_ids_after(
+        self, after: int, limit: int, exclude_vip: bool = False
+    ) -> list[int]:
+        """Keyset page of registered telegram_ids: telegram_id > after, ascending."""
+        stmt = (
+            select(User.telegram_id)
+            .where(
+                User.is_registered == True,
+                User.is_blocked == False,
+                User.telegram_id > after,
+            )
+            .order_by(User.telegram_id.asc())
+            .limit(limit)
+        )
         if exclude_vip:
             stmt = stmt.where(User.is_vip == False)
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
+    async def count_telegram_ids_after(self, after: int, exclude_vip: bool = False) -> int:
+        """Size of the rest of a keyset walk started by get_telegram_ids_after()."""
+        stmt = select(func.count()).select_from(User).where(
+            User.is_registered == True,
+            User.is_blocked == False,
+            User.telegram_id > after,
+        )
+        if exclude_vip:
+            stmt = stmt.where(User.is_vip == False)
+        result = await self.session.execute(stmt)
+        return result.scalar_one()
+
+    async def get_blocked_ids(self) -> list[int]:
+        stmt = select(User.telegram_id).where(User.is_blocked == True)
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def set_blocked(self, telegram_ids: list[int], blocked: bool) -> None:
+        stmt = (
+            update(User)
+            .where(User.telegram_id.in_(telegram_ids))
+            .values(is_blocked=blocked, blocked_at=datetime.now() if blocked else None)
+        )
+        await self.session.execute(stmt)
+
     async def update_profile(
         self,
         telegram_id: int,
@@ -108,11 +169,11 @@ class UserRepo:
             self.session.add(UserInterest(user_id=user_id, interest=interest.strip()))
         await self.session.flush()
 
-    async def increment_messages(self, telegram_id: int) -> None:
+    async def increment_messages(self, telegram_id: int, count: int = 1) -> None:
         stmt = (
             update(User)
             .where(User.telegram_id == telegram_id)
-            .values(messages_count=User.messages_count + 1)
+            .values(messages_count=User.messages_count + count)
         )
         await self.session.execute(stmt)
 
@@ -139,35 +200,30 @@ class UserRepo:
             )
         await self.session.execute(stmt)
 
-    async def top_by_karma(self, limit: int = 10) -> list[User]:
-        stmt = (
-            select(User)
-            .where(User.is_registered == True)
-            .order_by((User.karma_likes - User.karma_dislikes).desc())
-            .limit(limit)
-        )
-        result = await self.session.execute(stmt)
-        return list(result.scalars().all())
-
-    async def top_by_referrals(self, limit: int = 10) -> list[User]:
-        stmt = (
-            select(User)
-            .where(User.is_registered == True)
-            .order_by(User.referral_count.desc())
-            .limit(limit)
-        )
-        result = await self.session.execute(stmt)
-        return list(result.scalars().all())
-
-    async def top_by_activity(self, limit: int = 10) -> list[User]:
+    async def top_rows(self, metric: str, limit: int = 50) -> list:
+        """Leaderboard columns only (no full User rows), ordered by metric."""
+        order = {
+            "karma": (User.karma_likes - User.karma_dislikes).desc(),
+            "referrals": User.referral_count.desc(),
+            "activity": User.messages_count.desc(),
+        }[metric]
         stmt = (
-            select(User)
+            select(
+                User.telegram_id,
+                User.first_name,
+                User.username,
+                User.is_vip,
+                User.karma_likes,
+                User.karma_dislikes,
+                User.referral_count,
+                User.messages_count,
+            )
             .where(User.is_registered == True)
-            .order_by(User.messages_count.desc())
+            .order_by(order, User.id.asc())
             .limit(limit)
         )
         result = await self.session.execute(stmt)
-        return list(result.scalars().all())
+        return list(result.all())
 
     async def increment_referral(self, referrer_telegram_id: int) -> None:
         stmt = (
@@ -242,6 +298,28 @@ class UserRepo:
         result = await self.session.execute(stmt)
         return result.rowcount
 
+    async def get_active_vips(self) -> list[tuple[int, datetime]]:
+        """(telegram_id, vip_until) of all active VIPs with an expiry date."""
+        stmt = select(User.telegram_id, User.vip_until).where(
+            User.is_vip == True, User.vip_until != None
+        )
+        result = await self.session.execute(stmt)
+        return [(row.telegram_id, row.vip_until) for row in result.all()]
+
+    async def expire_vip(self, telegram_id: int) -> bool:
+        """Deactivate one user's VIP if it is really due (not extended meanwhile)."""
+        stmt = (
+            update(User)
+            .where(
+                User.telegram_id == telegram_id,
+                User.is_vip == True,
+                User.vip_until <= datetime.now(),
+            )
+            .values(is_vip=False)
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
+
     async def activate_vip(self, telegram_id: int, days: int) -> datetime:
         """Activate or extend VIP. Returns new vip_until datetime."""
         from datetime import timedelta
@@ -288,17 +366,22 @@ class ChatRepo:
         )
         await self.session.execute(stmt)
 
-    async def increment_messages(self, chat_id: int) -> None:
+    async def increment_messages(self, chat_id: int, count: int = 1) -> None:
         stmt = (
             update(Chat)
             .where(Chat.id == chat_id)
-            .values(messages_count=Chat.messages_count + 1)
+            .values(messages_count=Chat.messages_count + count)
         )
         await self.session.execute(stmt)
 
     def get_partner_id(self, chat: Chat, my_telegram_id: int) -> int:
         return chat.user2_id if chat.user1_id == my_telegram_id else chat.user1_id
 
+    async def count_active(self) -> int:
+        stmt = select(func.count()).select_from(Chat).where(Chat.status == ChatStatus.ACTIVE)
+        result = await self.session.execute(stmt)
+        return result.scalar_one()
+
 
 class SearchQueueRepo:
     def __init__(self, session: AsyncSession):
@@ -334,6 +417,10 @@ class SearchQueueRepo:
         stmt = delete(SearchQueue).where(SearchQueue.telegram_id == telegram_id)
         await self.session.execute(stmt)
 
+    async def remove_many(self, telegram_ids: list[int]) -> None:
+        stmt = delete(SearchQueue).where(SearchQueue.telegram_id.in_(telegram_ids))
+        await self.session.execute(stmt)
+
     ROOM_FALLBACK_SECONDS = 10
 
     async def find_match(self, user: User, room_id: int | None = None) -> SearchQueue | None:
@@ -434,6 +521,49 @@ class RatingRepo:
         return result.scalar_one_or_none() is not None
 
 
+class UserDailyStatRepo:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add_many(self, rows: list[dict]) -> None:
+        """Multi-row upsert of counter deltas: {telegram_id, day, karma_likes, karma_dislikes, messages_count}."""
+        if not rows:
+            return
+        stmt = mysql_insert(UserDailyStat).values(rows)
+        stmt = stmt.on_duplicate_key_update(
+            karma_likes=UserDailyStat.karma_likes + stmt.inserted.karma_likes,
+            karma_dislikes=UserDailyStat.karma_dislikes + stmt.inserted.karma_dislikes,
+            messages_count=UserDailyStat.messages_count + stmt.inserted.messages_count,
+        )
+        await self.session.execute(stmt)
+
+    async def top_window(self, metric: str, since: date, limit: int = 50) -> list:
+        """Top users by karma or activity summed over days >= since."""
+        likes = func.sum(UserDailyStat.karma_likes)
+        dislikes = func.sum(UserDailyStat.karma_dislikes)
+        messages = func.sum(UserDailyStat.messages_count)
+        order = (likes - dislikes).desc() if metric == "karma" else messages.desc()
+        stmt = (
+            select(
+                User.telegram_id,
+                User.first_name,
+                User.username,
+                User.is_vip,
+                likes.label("karma_likes"),
+                dislikes.label("karma_dislikes"),
+                messages.label("messages_count"),
+            )
+            .select_from(UserDailyStat)
+            .join(User, User.telegram_id == UserDailyStat.telegram_id)
+            .where(UserDailyStat.day >= since, User.is_registered == True)
+            .group_by(User.telegram_id, User.first_name, User.username, User.is_vip)
+            .order_by(order, User.telegram_id.asc())
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.all())
+
+
 class ReferralRepo:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -457,62 +587,38 @@ class VipPlanRepo:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_all_active(self) -> list[VipPlan]:
-        stmt = (
-            select(VipPlan)
-            .where(VipPlan.is_active == True)
-            .order_by(VipPlan.sort_order.asc(), VipPlan.id.asc())
-        )
+    async def get_all(self) -> list[VipPlan]:
+        """All rows including inactive ones, in display order (for the catalog cache)."""
+        stmt = select(VipPlan).order_by(VipPlan.sort_order.asc(), VipPlan.id.asc())
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
-    async def get_by_id(self, plan_id: int) -> VipPlan | None:
-        stmt = select(VipPlan).where(VipPlan.id == plan_id)
-        result = await self.session.execute(stmt)
-        return result.scalar_one_or_none()
-
-    async def seed_defaults(self) -> None:
-        stmt = select(func.count()).select_from(VipPlan)
-        result = await self.session.execute(stmt)
-        if result.scalar_one() > 0:
-            return
+    async def seed_defaults(self) -> int:
         defaults = [
             ("1 день", 1, 15, None, None, "⭐", 1),
             ("7 дней", 7, 150, None, None, "⭐", 2),
             ("1 месяц", 30, 250, None, "(-60%)", "⭐", 3),
             ("12 месяцев", 365, 400, None, None, "🎉", 4),
         ]
-        for name, days, stars, ton, discount, emoji, order in defaults:
-            self.session.add(VipPlan(
-                name=name, duration_days=days, price_stars=stars,
-                price_ton=ton, discount_text=discount, emoji=emoji, sort_order=order,
-            ))
-        await self.session.flush()
+        return await _insert_if_empty(
+            self.session,
+            VipPlan,
+            ["name", "duration_days", "price_stars", "price_ton", "discount_text", "emoji", "sort_order"],
+            defaults,
+        )
 
 
 class RoomRepo:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_all_active(self) -> list[Room]:
-        stmt = (
-            select(Room)
-            .where(Room.is_active == True)
-            .order_by(Room.sort_order.asc(), Room.id.asc())
-        )
+    async def get_all(self) -> list[Room]:
+        """All rows including inactive ones, in display order (for the catalog cache)."""
+        stmt = select(Room).order_by(Room.sort_order.asc(), Room.id.asc())
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
-    async def get_by_id(self, room_id: int) -> Room | None:
-        stmt = select(Room).where(Room.id == room_id)
-        result = await self.session.execute(stmt)
-        return result.scalar_one_or_none()
-
-    async def seed_defaults(self) -> None:
-        stmt = select(func.count()).select_from(Room)
-        result = await self.session.execute(stmt)
-        if result.scalar_one() > 0:
-            return
+    async def seed_defaults(self) -> int:
         defaults = [
             ("Флирт", "❤️", "Романтическое общение и знакомства", 1),
             ("Дружба", "🤝", "Найти новых друзей", 2),
@@ -522,9 +628,9 @@ class RoomRepo:
             ("Кино", "🎬", "Обсуждение фильмов и сериалов", 6),
             ("18+", "🔞", "Только для совершеннолетних", 7),
         ]
-        for name, emoji, desc, order in defaults:
-            self.session.add(Room(name=name, emoji=emoji, description=desc, sort_order=order))
-        await self.session.flush()
+        return await _insert_if_empty(
+            self.session, Room, ["name", "emoji", "description", "sort_order"], defaults
+        )
 
 
 class MessageLogRepo:
@@ -553,28 +659,24 @@ class MessageLogRepo:
         self.session.add(entry)
         await self.session.flush()
 
+    async def log_many(self, entries: list[MessageLog]) -> None:
+        """Log several messages with one flush (album parts)."""
+        self.session.add_all(entries)
+        await self.session.flush()
+
 
 class InterestRepo:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_all_active(self) -> list[InterestOption]:
-        stmt = (
-            select(InterestOption)
-            .where(InterestOption.is_active == True)
-            .order_by(InterestOption.sort_order.asc(), InterestOption.id.asc())
-        )
+    async def get_all(self) -> list[InterestOption]:
+        """All rows including inactive ones, in display order (for the catalog cache)."""
+        stmt = select(InterestOption).order_by(InterestOption.sort_order.asc(), InterestOption.id.asc())
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
-    async def seed_defaults(self) -> None:
+    async def seed_defaults(self) -> int:
         """Seed default interests if table is empty."""
-        stmt = select(func.count()).select_from(InterestOption)
-        result = await self.session.execute(stmt)
-        count = result.scalar_one()
-        if count > 0:
-            return
-
         defaults = [
             ("Общение", "💬", 1),
             ("Флирт", "❤️", 2),
@@ -593,6 +695,180 @@ class InterestRepo:
             ("Авто", "🚗", 15),
             ("Природа", "🌿", 16),
         ]
-        for name, emoji, order in defaults:
-            self.session.add(InterestOption(name=name, emoji=emoji, sort_order=order))
+        return await _insert_if_empty(
+            self.session, InterestOption, ["name", "emoji", "sort_order"], defaults
+        )
+
+
+class BroadcastRepo:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create(
+        self,
+        from_chat_id: int,
+        message_ids: list[int],
+        report_chat_id: int,
+        exclude_vip: bool = False,
+        owner: str | None = None,
+        lease_until: datetime | None = None,
+    ) -> Broadcast:
+        job = Broadcast(
+            from_chat_id=from_chat_id,
+            message_ids=",".join(str(m) for m in message_ids),
+            report_chat_id=report_chat_id,
+            exclude_vip=exclude_vip,
+            status=BroadcastStatus.RUNNING,
+            owner=owner,
+            lease_until=lease_until,
+        )
+        self.session.add(job)
         await self.session.flush()
+        return job
+
+    async def get_by_id(self, job_id: int) -> Broadcast | None:
+        stmt = select(Broadcast).where(Broadcast.id == job_id)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_by_status(self, *statuses: BroadcastStatus) -> list[Broadcast]:
+        stmt = (
+            select(Broadcast)
+            .where(Broadcast.status.in_(statuses))
+            .order_by(Broadcast.id.asc())
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def claim(
+        self,
+        job_id: int,
+        owner: str,
+        lease_until: datetime,
+        status: BroadcastStatus = BroadcastStatus.RUNNING,
+    ) -> bool:
+        """
+        Take a job in `status` for `owner` unless another process holds a live
+        lease on it; the job becomes RUNNING. False if someone else has it.
+        """
+        stmt = (
+            update(Broadcast)
+            .where(
+                Broadcast.id == job_id,
+                Broadcast.status == status,
+                (Broadcast.owner.is_(None))
+                | (Broadcast.owner == owner)
+                | (Broadcast.lease_until < datetime.now()),
+            )
+            .values(status=BroadcastStatus.RUNNING, owner=owner, lease_until=lease_until)
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount == 1
+
+    async def save_progress(
+        self,
+        job_id: int,
+        owner: str,
+        last_telegram_id: int,
+        sent_count: int,
+        failed_count: int,
+        lease_until: datetime | None = None,
+        status: BroadcastStatus | None = None,
+    ) -> bool:
+        """
+        Checkpoint a job held by `owner`, extending its lease. A final `status`
+        releases the job. False if the lease was lost to another process.
+        """
+        values = {
+            "last_telegram_id": last_telegram_id,
+            "sent_count": sent_count,
+            "failed_count": failed_count,
+            "lease_until": lease_until,
+        }
+        if status is not None:
+            values.update(status=status, owner=None, lease_until=None)
+        stmt = (
+            update(Broadcast)
+            .where(Broadcast.id == job_id, Broadcast.owner == owner)
+            .values(**values)
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount == 1
+
+    async def renew_lease(self, job_id: int, owner: str, lease_until: datetime) -> bool:
+        stmt = (
+            update(Broadcast)
+            .where(Broadcast.id == job_id, Broadcast.owner == owner)
+            .values(lease_until=lease_until)
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount == 1
+
+    async def cancel(self, job_id: int) -> bool:
+        """
+        Cancel a paused or running job, releasing it. A process still running
+        it loses its lease and stops at its next checkpoint. False if already over.
+        """
+        stmt = (
+            update(Broadcast)
+            .where(
+                Broadcast.id == job_id,
+                Broadcast.status.in_((BroadcastStatus.PAUSED, BroadcastStatus.RUNNING)),
+            )
+            .values(status=BroadcastStatus.CANCELLED, owner=None, lease_until=None)
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount == 1
+
+
+class FsmRecordRepo:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, key: str) -> FsmRecord | None:
+        stmt = select(FsmRecord).where(FsmRecord.key == key, FsmRecord.expires_at > datetime.now())
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def set_state(self, key: str, state: str | None, expires_at: datetime) -> None:
+        stmt = mysql_insert(FsmRecord).values(key=key, state=state, data="{}", expires_at=expires_at)
+        stmt = stmt.on_duplicate_key_update(
+            state=stmt.inserted.state,
+            # An expired row's data must not come back to life
+            data=func.if_(FsmRecord.expires_at > func.now(), FsmRecord.data, stmt.inserted.data),
+            expires_at=stmt.inserted.expires_at,
+        )
+        await self.session.execute(stmt)
+
+    async def set_data(self, key: str, data: str, expires_at: datetime) -> None:
+        stmt = mysql_insert(FsmRecord).values(key=key, state=None, data=data, expires_at=expires_at)
+        stmt = stmt.on_duplicate_key_update(
+            state=func.if_(FsmRecord.expires_at > func.now(), FsmRecord.state, None),
+            data=stmt.inserted.data,
+            expires_at=stmt.inserted.expires_at,
+        )
+        await self.session.execute(stmt)
+
+    async def delete_expired(self) -> int:
+        stmt = delete(FsmRecord).where(FsmRecord.expires_at <= datetime.now())
+        result = await self.session.execute(stmt)
+        return result.rowcount
+
+
+class SchemaMetaRepo:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_all(self) -> dict[str, str]:
+        """Every marker; empty if the table does not exist yet (first start)."""
+        try:
+            result = await self.session.execute(select(SchemaMeta.key, SchemaMeta.value))
+        except ProgrammingError:
+            await self.session.rollback()
+            return {}
+        return dict(result.all())
+
+    async def set(self, key: str, value: str) -> None:
+        stmt = mysql_insert(SchemaMeta).values(key=key, value=value)
+        stmt = stmt.on_duplicate_key_update(value=stmt.inserted.value)
+        await self.session.execute(stmt)
@@ -1,13 +1,15 @@
-import asyncio
 import logging
 
-from aiogram import Router, F, Bot
-from aiogram.filters import Command
+from aiogram import Router, F, Bot, html
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
-from aiogram.types import Message, InputMediaPhoto, InputMediaVideo
+from aiogram.types import Message
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.db.repositories import UserRepo
+from bot.db.profiling import query_report
+from bot.services.broadcast import BroadcastEngine
+from bot.services.catalog import catalog
+from bot.services.media_group import MediaGroupCollector
 from bot.states.registration import BroadcastStates
 
 router = Router()
@@ -15,10 +17,6 @@ logger = logging.getLogger(__name__)
 
 ADMIN_ID = 1008871802
 
-# Temporary storage for album collection: {media_group_id: [messages]}
-_album_buf: dict[str, list[Message]] = {}
-_album_lock = asyncio.Lock()
-
 
 def _is_admin(message: Message) -> bool:
     return message.from_user.id == ADMIN_ID
@@ -54,162 +52,142 @@ async def cmd_cancel_broadcast(message: Message, state: FSMContext):
     await message.answer("❌ Рассылка отменена.")
 
 
-# ─── Handle album (media_group) ───
+# ─── /reload — re-read interests, rooms and VIP plans ───
 
-@router.message(BroadcastStates.waiting_content, F.media_group_id)
-async def collect_album(message: Message, state: FSMContext, session: AsyncSession, bot: Bot):
+@router.message(Command("reload"))
+async def cmd_reload(message: Message, session: AsyncSession):
+    if not _is_admin(message):
+        return
+    snapshot = await catalog.reload(session)
+    await message.answer(
+        f"🔄 Каталог обновлён:\n"
+        f"🎯 Интересов: {len(snapshot.interests)}\n"
+        f"🏠 Комнат: {len(snapshot.rooms)}\n"
+        f"👑 Тарифов VIP: {len(snapshot.vip_plans)}"
+    )
+
+
+@router.message(Command("queryreport"))
+async def cmd_queryreport(message: Message, command: CommandObject):
+    """SQL statements per handler, collected when DB_QUERY_PROFILE=1. `/queryreport reset` clears it."""
     if not _is_admin(message):
         return
+    if command.args and command.args.strip() == "reset":
+        query_report.reset()
+        await message.answer("🧹 Статистика запросов сброшена.")
+        return
+    await message.answer(f"<pre>{html.quote(query_report.summary())}</pre>")
 
-    group_id = message.media_group_id
 
-    async with _album_lock:
-        if group_id not in _album_buf:
-            _album_buf[group_id] = []
-            # Schedule processing after a short delay to collect all parts
-            asyncio.create_task(_process_album_delayed(group_id, state, session, bot, message))
-        _album_buf[group_id].append(message)
+# ─── Broadcast job control ───
 
+def _job_id(command: CommandObject) -> int | None:
+    if command.args and command.args.strip().isdigit():
+        return int(command.args.strip())
+    return None
 
-async def _process_album_delayed(
-    group_id: str,
-    state: FSMContext,
-    session: AsyncSession,
+
+@router.message(Command("bcstatus"))
+async def cmd_bcstatus(message: Message, broadcaster: BroadcastEngine):
+    if not _is_admin(message):
+        return
+    if not broadcaster.jobs:
+        await message.answer("📭 Активных рассылок нет.")
+        return
+    await message.answer("\n\n".join(job.progress_text() for job in broadcaster.jobs.values()))
+
+
+@router.message(Command("bcpause"))
+async def cmd_bcpause(message: Message, command: CommandObject, broadcaster: BroadcastEngine):
+    if not _is_admin(message):
+        return
+    job_id = _job_id(command)
+    if job_id is None or not broadcaster.pause(job_id):
+        await message.answer("❌ Активная рассылка не найдена. Использование: /bcpause <id>")
+        return
+    await message.answer(f"⏸ Рассылка #{job_id} будет приостановлена.")
+
+
+@router.message(Command("bcresume"))
+async def cmd_bcresume(
+    message: Message,
+    command: CommandObject,
     bot: Bot,
-    trigger_msg: Message,
+    broadcaster: BroadcastEngine,
 ):
-    """Wait for all album parts to arrive, then broadcast."""
-    await asyncio.sleep(1.0)  # wait for all parts
-
-    async with _album_lock:
-        messages = _album_buf.pop(group_id, [])
-
-    if not messages:
-        return
-
-    # Sort by message_id to preserve order
-    messages.sort(key=lambda m: m.message_id)
-
-    # Build media group
-    media_group = []
-    for i, msg in enumerate(messages):
-        caption = msg.caption if i == 0 else None
-        entities = msg.caption_entities if i == 0 else None
-        if msg.photo:
-            item = InputMediaPhoto(
-                media=msg.photo[-1].file_id,
-                caption=caption,
-                caption_entities=entities,
-            )
-        elif msg.video:
-            item = InputMediaVideo(
-                media=msg.video.file_id,
-                caption=caption,
-                caption_entities=entities,
-            )
-        else:
-            continue
-        media_group.append(item)
-
-    if not media_group:
+    if not _is_admin(message):
         return
+    job_id = _job_id(command)
+    job = await broadcaster.resume(bot, job_id) if job_id is not None else None
+    if job is None:
+        await message.answer("❌ Приостановленная рассылка не найдена. Использование: /bcresume <id>")
+        return
+    await message.answer(f"▶️ Рассылка #{job.id} продолжена ({job.label}).")
+
 
+@router.message(Command("bccancel"))
+async def cmd_bccancel(message: Message, command: CommandObject, broadcaster: BroadcastEngine):
+    if not _is_admin(message):
+        return
+    job_id = _job_id(command)
+    if job_id is None or not await broadcaster.cancel(job_id):
+        await message.answer("❌ Рассылка не найдена. Использование: /bccancel <id>")
+        return
+    await message.answer(f"🛑 Рассылка #{job_id} отменяется.")
+
+
+async def _start_broadcast(
+    state: FSMContext,
+    bot: Bot,
+    broadcaster: BroadcastEngine,
+    trigger_msg: Message,
+    message_ids: list[int],
+):
     data = await state.get_data()
     exclude_vip = data.get("exclude_vip", False)
     await state.clear()
 
-    user_repo = UserRepo(session)
-    user_ids = await user_repo.get_all_telegram_ids(exclude_vip=exclude_vip)
+    # The job posts and keeps updating its own progress message
+    await broadcaster.create(
+        bot,
+        from_chat_id=trigger_msg.chat.id,
+        message_ids=message_ids,
+        report_chat_id=trigger_msg.chat.id,
+        exclude_vip=exclude_vip,
+    )
+
+
+# ─── Handle album (media_group) ───
+
+@router.message(BroadcastStates.waiting_content, F.media_group_id)
+async def collect_album(
+    message: Message,
+    state: FSMContext,
+    bot: Bot,
+    broadcaster: BroadcastEngine,
+    media_groups: MediaGroupCollector,
+):
+    if not _is_admin(message):
+        return
 
-    success, fail = 0, 0
-    for uid in user_ids:
-        try:
-            await bot.send_media_group(uid, media=media_group)
-            success += 1
-        except Exception:
-            fail += 1
-        await asyncio.sleep(0.05)  # rate limit
+    async def on_album(messages: list[Message], session: AsyncSession):
+        # copyMessages keeps the album grouped; ids arrive sorted ascending
+        message_ids = [m.message_id for m in messages]
+        await _start_broadcast(state, bot, broadcaster, messages[0], message_ids)
 
-    label = "без VIP" if exclude_vip else "всем"
-    await trigger_msg.answer(f"✅ Альбом отправлен ({label}):\n📨 {success} доставлено, ❌ {fail} ошибок")
-    logger.info(f"Broadcast album ({label}): {success} ok, {fail} fail")
+    media_groups.add(message, on_album)
 
 
 # ─── Handle single message (text / photo / video) ───
 
 @router.message(BroadcastStates.waiting_content)
-async def broadcast_single(message: Message, state: FSMContext, session: AsyncSession, bot: Bot):
+async def broadcast_single(
+    message: Message,
+    state: FSMContext,
+    bot: Bot,
+    broadcaster: BroadcastEngine,
+):
     if not _is_admin(message):
         return
 
-    data = await state.get_data()
-    exclude_vip = data.get("exclude_vip", False)
-    await state.clear()
-
-    user_repo = UserRepo(session)
-    user_ids = await user_repo.get_all_telegram_ids(exclude_vip=exclude_vip)
-
-    success, fail = 0, 0
-    for uid in user_ids:
-        try:
-            await _send_copy(bot, uid, message)
-            success += 1
-        except Exception:
-            fail += 1
-        await asyncio.sleep(0.05)
-
-    label = "без VIP" if exclude_vip else "всем"
-    await message.answer(f"✅ Рассылка завершена ({label}):\n📨 {success} доставлено, ❌ {fail} ошибок")
-    logger.info(f"Broadcast single ({label}): {success} ok, {fail} fail")
-
-
-async def _send_copy(bot: Bot, chat_id: int, msg: Message):
-    """Send a copy of the message preserving formatting, media, and captions."""
-    if msg.text:
-        await bot.send_message(
-            chat_id,
-            msg.text,
-            entities=msg.entities,
-        )
-    elif msg.photo:
-        await bot.send_photo(
-            chat_id,
-            msg.photo[-1].file_id,
-            caption=msg.caption,
-            caption_entities=msg.caption_entities,
-        )
-    elif msg.video:
-        await bot.send_video(
-            chat_id,
-            msg.video.file_id,
-            caption=msg.caption,
-            caption_entities=msg.caption_entities,
-        )
-    elif msg.document:
-        await bot.send_document(
-            chat_id,
-            msg.document.file_id,
-            caption=msg.caption,
-            caption_entities=msg.caption_entities,
-        )
-    elif msg.sticker:
-        await bot.send_sticker(chat_id, msg.sticker.file_id)
-    elif msg.voice:
-        await bot.send_voice(
-            chat_id,
-            msg.voice.file_id,
-            caption=msg.caption,
-            caption_entities=msg.caption_entities,
-        )
-    elif msg.video_note:
-        await bot.send_video_note(chat_id, msg.video_note.file_id)
-    elif msg.animation:
-        await bot.send_animation(
-            chat_id,
-            msg.animation.file_id,
-            caption=msg.caption,
-            caption_entities=msg.caption_entities,
-        )
-    else:
-        # Fallback: copy as-is
-        await msg.copy_to(chat_id)
+    await _start_broadcast(state, bot, broadcaster, message, [message.message_id])
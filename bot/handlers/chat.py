@@ -3,13 +3,23 @@ from collections import defaultdict
 
 from aiogram import Router, F, Bot
 from aiogram.filters import Command
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import (
+    Message,
+    CallbackQuery,
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputMediaVideo,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.repositories import UserRepo, ChatRepo, RatingRepo
 from bot.db.models import RatingValue
 from bot.keyboards.inline import rating_keyboard
 from bot.services.chat import ChatService
+from bot.services.leaderboard import leaderboard
+from bot.services.media_group import MediaGroupCollector
+from bot.services.reachability import DeliveryError, reachability
+from bot.services.rollups import rollups
 
 router = Router()
 
@@ -49,6 +59,13 @@ async def _check_media_allowed(message: Message, session: AsyncSession) -> bool:
     return True
 
 
+async def _delivery_failed(message: Message, partner_id: int, exc: Exception, text: str):
+    """Tell the sender a relay failed; flag the partner if they are gone for good."""
+    if reachability.on_delivery_error(partner_id, exc) == DeliveryError.PERMANENT:
+        text = "🚫 Собеседник заблокировал бота.\n/stop — завершить чат, /next — новый собеседник"
+    await message.answer(text)
+
+
 @router.message(Command("stop"))
 async def cmd_stop(
     message: Message,
@@ -103,8 +120,8 @@ async def cmd_lnk(
     try:
         await bot.send_message(partner_id, link)
         await message.answer("✅ Ссылка на ваш профиль отправлена собеседнику!")
-    except Exception:
-        await message.answer("❌ Не удалось отправить ссылку.")
+    except Exception as e:
+        await _delivery_failed(message, partner_id, e, "❌ Не удалось отправить ссылку.")
 
 
 # --- Rating callback ---
@@ -146,6 +163,8 @@ async def process_rating(
     value = RatingValue.LIKE if action == "like" else RatingValue.DISLIKE
     await rating_repo.add_rating(chat_id, callback.from_user.id, partner_id, value)
     await user_repo.add_karma(partner_id, is_like=(action == "like"))
+    leaderboard.on_karma(partner_id, is_like=(action == "like"))
+    rollups.add_karma(partner_id, is_like=(action == "like"))
 
     emoji = "👍" if action == "like" else "👎"
     await callback.message.edit_text(f"{emoji} Вы поставили {'лайк' if action == 'like' else 'дизлайк'} собеседнику.")
@@ -171,8 +190,55 @@ async def relay_text_message(
 
     try:
         await bot.send_message(partner_id, message.text)
-    except Exception:
-        await message.answer("❌ Не удалось доставить сообщение.")
+    except Exception as e:
+        await _delivery_failed(message, partner_id, e, "❌ Не удалось доставить сообщение.")
+
+
+def _album_item(message: Message) -> tuple[str, str, InputMediaPhoto | InputMediaVideo | InputMediaDocument]:
+    """(content_type, file_id, input media) for one album part."""
+    if message.photo:
+        fid = message.photo[-1].file_id
+        return "photo", fid, InputMediaPhoto(media=fid, caption=message.caption)
+    if message.video:
+        fid = message.video.file_id
+        return "video", fid, InputMediaVideo(media=fid, caption=message.caption)
+    fid = message.document.file_id
+    return "document", fid, InputMediaDocument(media=fid, caption=message.caption)
+
+
+@router.message(F.media_group_id, F.photo | F.video | F.document)
+async def relay_album(
+    message: Message,
+    bot: Bot,
+    media_groups: MediaGroupCollector,
+):
+    """
+    Album parts are collected and relayed as one media group. The whole album
+    counts as one media against the limit, checked once when it is complete.
+    """
+
+    async def on_album(messages: list[Message], album_session: AsyncSession):
+        if not await _check_media_allowed(message, album_session):
+            return
+        chat_service = ChatService(bot, album_session)
+        chat = await chat_service.get_active_chat(message.from_user.id)
+        if chat is None:
+            await message.answer("💤 У вас нет активного чата.")
+            return
+        partner_id = chat_service.chat_repo.get_partner_id(chat, message.from_user.id)
+        items = [_album_item(m) for m in messages]
+        try:
+            await bot.send_media_group(partner_id, media=[media for _, _, media in items])
+        except Exception as e:
+            await _delivery_failed(message, partner_id, e, "❌ Не удалось доставить альбом.")
+            return
+        await chat_service.log_album(
+            chat,
+            message.from_user.id,
+            [(content_type, fid, m.caption) for m, (content_type, fid, _) in zip(messages, items)],
+        )
+
+    media_groups.add(message, on_album)
 
 
 @router.message(F.photo)
@@ -195,8 +261,8 @@ async def relay_photo(
             message.from_user.id, "[photo]",
             content_type="photo", file_id=fid, caption=message.caption,
         )
-    except Exception:
-        await message.answer("❌ Не удалось доставить фото.")
+    except Exception as e:
+        await _delivery_failed(message, partner_id, e, "❌ Не удалось доставить фото.")
 
 
 @router.message(F.sticker)
@@ -219,8 +285,8 @@ async def relay_sticker(
             message.from_user.id, "[sticker]",
             content_type="sticker", file_id=fid,
         )
-    except Exception:
-        await message.answer("❌ Не удалось доставить стикер.")
+    except Exception as e:
+        await _delivery_failed(message, partner_id, e, "❌ Не удалось доставить стикер.")
 
 
 @router.message(F.voice)
@@ -243,8 +309,8 @@ async def relay_voice(
             message.from_user.id, "[voice]",
             content_type="voice", file_id=fid,
         )
-    except Exception:
-        await message.answer("❌ Не удалось доставить голосовое сообщение.")
+    except Exception as e:
+        await _delivery_failed(message, partner_id, e, "❌ Не удалось доставить голосовое сообщение.")
 
 
 @router.message(F.video)
@@ -267,8 +333,8 @@ async def relay_video(
             message.from_user.id, "[video]",
             content_type="video", file_id=fid, caption=message.caption,
         )
-    except Exception:
-        await message.answer("❌ Не удалось доставить видео.")
+    except Exception as e:
+        await _delivery_failed(message, partner_id, e, "❌ Не удалось доставить видео.")
 
 
 @router.message(F.video_note)
@@ -291,8 +357,8 @@ async def relay_video_note(
             message.from_user.id, "[video_note]",
             content_type="video_note", file_id=fid,
         )
-    except Exception:
-        await message.answer("❌ Не удалось доставить видеосообщение.")
+    except Exception as e:
+        await _delivery_failed(message, partner_id, e, "❌ Не удалось доставить видеосообщение.")
 
 
 @router.message(F.document)
@@ -315,5 +381,5 @@ async def relay_document(
             message.from_user.id, "[document]",
             content_type="document", file_id=fid, caption=message.caption,
         )
-    except Exception:
-        await message.answer("❌ Не удалось доставить документ.")
+    except Exception as e:
+        await _delivery_failed(message, partner_id, e, "❌ Не удалось доставить документ.")
@@ -3,7 +3,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery, LabeledPrice
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.db.repositories import UserRepo, InterestRepo, VipPlanRepo, RoomRepo
+from bot.db.repositories import UserRepo
 from bot.db.models import GenderEnum, User
 from bot.keyboards.inline import (
     main_menu_keyboard,
@@ -18,6 +18,7 @@ from bot.keyboards.inline import (
     vip_plans_keyboard,
     rooms_keyboard,
 )
+from bot.services.catalog import catalog
 from bot.services.chat import ChatService
 from bot.states.registration import RegistrationStates, SearchSettingsStates
 
@@ -66,12 +67,6 @@ def _format_profile(user: User, interests: list[str]) -> str:
     )
 
 
-async def _get_interest_options(session: AsyncSession) -> list[tuple[str, str]]:
-    repo = InterestRepo(session)
-    options = await repo.get_all_active()
-    return [(o.name, o.emoji) for o in options]
-
-
 async def _gender_search(message: Message, session: AsyncSession, bot: Bot, gender: GenderEnum):
     """Shared logic for gender-based search with daily limit check."""
     user_repo = UserRepo(session)
@@ -156,9 +151,7 @@ async def btn_vip(message: Message, session: AsyncSession):
     if user.is_vip and user.vip_until:
         vip_until = f"\n⏳ Действует до: {user.vip_until.strftime('%d.%m.%Y %H:%M')} UTC"
 
-    # Load plans from DB
-    plan_repo = VipPlanRepo(session)
-    plans = await plan_repo.get_all_active()
+    plans = catalog.snapshot.vip_plans
     plan_data = [
         (p.id, p.name, p.price_stars, p.duration_days, p.discount_text, p.emoji)
         for p in plans
@@ -182,10 +175,9 @@ async def btn_vip(message: Message, session: AsyncSession):
 
 
 @router.callback_query(F.data.startswith("vip_buy:"))
-async def vip_buy(callback: CallbackQuery, session: AsyncSession, bot: Bot):
+async def vip_buy(callback: CallbackQuery, bot: Bot):
     plan_id = int(callback.data.split(":")[1])
-    plan_repo = VipPlanRepo(session)
-    plan = await plan_repo.get_by_id(plan_id)
+    plan = catalog.vip_plan(plan_id)
     if not plan:
         await callback.answer("Тариф не найден.", show_alert=True)
         return
@@ -231,8 +223,7 @@ async def btn_rooms(message: Message, session: AsyncSession):
         await message.answer("❌ Сначала зарегистрируйтесь: /start")
         return
 
-    room_repo = RoomRepo(session)
-    rooms = await room_repo.get_all_active()
+    rooms = catalog.snapshot.rooms
     if not rooms:
         await message.answer(
             "🏠 Комнаты\n\n🚧 Пока нет доступных комнат.",
@@ -258,8 +249,7 @@ async def room_select(callback: CallbackQuery, session: AsyncSession, bot: Bot):
         await callback.answer("❌ Сначала зарегистрируйтесь", show_alert=True)
         return
 
-    room_repo = RoomRepo(session)
-    room = await room_repo.get_by_id(room_id)
+    room = catalog.room(room_id)
     if not room:
         await callback.answer("Комната не найдена.", show_alert=True)
         return
@@ -329,7 +319,7 @@ async def edit_interests(callback: CallbackQuery, state: FSMContext, session: As
     user = await user_repo.get_by_telegram_id(callback.from_user.id)
     current = [i.interest for i in user.interests] if user and user.interests else []
 
-    options = await _get_interest_options(session)
+    options = catalog.snapshot.interest_options
     await callback.message.edit_text(
         "🎯 Выберите ваши интересы (можно несколько), затем нажмите ✅ Готово:\n\n"
         f"Выбрано: {', '.join(current) if current else 'ничего не выбрано'}",
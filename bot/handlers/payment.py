@@ -3,6 +3,8 @@ from aiogram.types import PreCheckoutQuery, Message
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.repositories import UserRepo
+from bot.services.leaderboard import leaderboard
+from bot.services.vip_expiry import vip_expiry
 
 router = Router()
 
@@ -27,6 +29,8 @@ async def successful_payment(message: Message, session: AsyncSession):
     user_repo = UserRepo(session)
     new_until = await user_repo.activate_vip(message.from_user.id, duration_days)
     await session.commit()
+    vip_expiry.schedule(message.from_user.id, new_until)
+    leaderboard.set_vip(message.from_user.id, True)
 
     await message.answer(
         f"✅ Оплата прошла успешно!\n\n"
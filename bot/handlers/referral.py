@@ -4,6 +4,8 @@ from aiogram.types import Message
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.repositories import UserRepo
+from bot.services.leaderboard import leaderboard
+from bot.services.vip_expiry import vip_expiry
 
 router = Router()
 
@@ -62,6 +64,8 @@ async def cmd_exchange(
     if success:
         new_vip = await user_repo.activate_vip(message.from_user.id, days=1)
         await session.commit()
+        vip_expiry.schedule(message.from_user.id, new_vip)
+        leaderboard.set_vip(message.from_user.id, True)
 
         await message.answer(
             f"✅ Обмен успешен!\n\n"
@@ -4,7 +4,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.db.repositories import UserRepo, ReferralRepo, InterestRepo
+from bot.db.repositories import UserRepo, ReferralRepo
 from bot.db.models import GenderEnum
 from bot.keyboards.inline import (
     gender_keyboard,
@@ -14,17 +14,13 @@ from bot.keyboards.inline import (
     main_menu_keyboard,
 )
 from bot.states.registration import RegistrationStates
+from bot.services.catalog import catalog
 from bot.services.chat import ChatService
+from bot.services.leaderboard import leaderboard
 
 router = Router()
 
 
-async def _get_interest_options(session: AsyncSession) -> list[tuple[str, str]]:
-    repo = InterestRepo(session)
-    options = await repo.get_all_active()
-    return [(o.name, o.emoji) for o in options]
-
-
 @router.message(CommandStart())
 async def cmd_start(
     message: Message,
@@ -52,6 +48,7 @@ async def cmd_start(
                     await user_repo.increment_referral(referrer_id)
                     user.referred_by = referrer_id
                     await session.commit()
+                    leaderboard.on_referral(referrer_id)
                 except Exception:
                     pass
 
@@ -137,7 +134,7 @@ async def process_country(callback: CallbackQuery, state: FSMContext, session: A
         return
 
     await state.update_data(country=country)
-    options = await _get_interest_options(session)
+    options = catalog.snapshot.interest_options
     await callback.message.edit_text(
         "🎯 Выберите ваши интересы (можно несколько), затем нажмите ✅ Готово:",
         reply_markup=interests_keyboard(options),
@@ -212,7 +209,7 @@ async def process_interest(callback: CallbackQuery, state: FSMContext, session:
         await callback.answer(f"✅ {value} добавлен")
     await state.update_data(interests=interests)
 
-    options = await _get_interest_options(session)
+    options = catalog.snapshot.interest_options
     selected = ", ".join(interests) if interests else "ничего не выбрано"
     await callback.message.edit_text(
         f"🎯 Выберите ваши интересы (можно несколько), затем нажмите ✅ Готово:\n\n"
@@ -1,3 +1,5 @@
+from functools import cache, lru_cache
+
 from aiogram.types import (
     InlineKeyboardButton,
     InlineKeyboardMarkup,
@@ -5,9 +7,14 @@ from aiogram.types import (
     ReplyKeyboardMarkup,
 )
 
+# Keyboards are memoized: static ones are built once, parametrized ones are
+# cached by their (hashable) arguments, except per-chat ones that would never
+# hit. Returned markups are shared between calls — never mutate them.
+
 
 # ─── Main reply keyboard (under input field) ───
 
+@cache
 def main_menu_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -29,6 +36,7 @@ def main_menu_keyboard() -> ReplyKeyboardMarkup:
 
 # ─── Inline keyboards ───
 
+@cache
 def gender_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -38,6 +46,7 @@ def gender_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cache
 def age_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -55,6 +64,7 @@ def age_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cache
 def country_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -73,15 +83,21 @@ def country_keyboard() -> InlineKeyboardMarkup:
 
 
 def interests_keyboard(
-    options: list[tuple[str, str]],
+    options: list[tuple[str, str]] | tuple[tuple[str, str], ...],
     selected: list[str] | None = None,
 ) -> InlineKeyboardMarkup:
     """Build interests keyboard dynamically from DB options.
     options: list of (name, emoji) tuples
     selected: list of currently selected interest names
     """
-    if selected is None:
-        selected = []
+    return _interests_keyboard(tuple(options), frozenset(selected or ()))
+
+
+@lru_cache(maxsize=256)
+def _interests_keyboard(
+    options: tuple[tuple[str, str], ...],
+    selected: frozenset[str],
+) -> InlineKeyboardMarkup:
     rows: list[list[InlineKeyboardButton]] = []
     row: list[InlineKeyboardButton] = []
     for name, emoji in options:
@@ -100,6 +116,7 @@ def interests_keyboard(
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@cache
 def profile_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -116,6 +133,7 @@ def profile_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+# Not memoized: every chat_id is new, so a cache would almost never hit
 def rating_keyboard(chat_id: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -128,14 +146,24 @@ def rating_keyboard(chat_id: int) -> InlineKeyboardMarkup:
     ])
 
 
+@cache
 def top_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="👁️ По карме", callback_data="top:karma")],
+        [
+            InlineKeyboardButton(text="☀️ Карма за день", callback_data="top:karma_day"),
+            InlineKeyboardButton(text="📅 Карма за неделю", callback_data="top:karma_week"),
+        ],
         [InlineKeyboardButton(text="🎪 По рефералам", callback_data="top:referrals")],
         [InlineKeyboardButton(text="📧 По активности", callback_data="top:activity")],
+        [
+            InlineKeyboardButton(text="☀️ Активность за день", callback_data="top:activity_day"),
+            InlineKeyboardButton(text="📅 Активность за неделю", callback_data="top:activity_week"),
+        ],
     ])
 
 
+@cache
 def pref_gender_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -148,6 +176,7 @@ def pref_gender_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cache
 def pref_age_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -168,6 +197,7 @@ def pref_age_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cache
 def pref_country_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -189,6 +219,14 @@ def vip_plans_keyboard(
     ton_wallet: str | None = None,
 ) -> InlineKeyboardMarkup:
     """plans: list of (id, name, price_stars, duration_days, discount_text, emoji)"""
+    return _vip_plans_keyboard(tuple(plans), ton_wallet)
+
+
+@lru_cache(maxsize=16)
+def _vip_plans_keyboard(
+    plans: tuple[tuple[int, str, int, int, str | None, str], ...],
+    ton_wallet: str | None,
+) -> InlineKeyboardMarkup:
     rows: list[list[InlineKeyboardButton]] = []
     for plan_id, name, price_stars, duration_days, discount, emoji in plans:
         discount_str = f" {discount}" if discount else ""
@@ -205,6 +243,13 @@ def rooms_keyboard(
     rooms: list[tuple[int, str, str, str | None]],
 ) -> InlineKeyboardMarkup:
     """rooms: list of (id, name, emoji, description)"""
+    return _rooms_keyboard(tuple(rooms))
+
+
+@lru_cache(maxsize=16)
+def _rooms_keyboard(
+    rooms: tuple[tuple[int, str, str, str | None], ...],
+) -> InlineKeyboardMarkup:
     rows: list[list[InlineKeyboardButton]] = []
     for room_id, name, emoji, desc in rooms:
         rows.append([InlineKeyboardButton(
@@ -0,0 +1,131 @@
+"""
+Logging off the event loop.
+
+Handlers and tasks only put records on a queue; a listener thread formats
+and writes them. On the loop a record costs the message formatting, a
+context lookup and a queue put — no I/O. Each record carries the update
+id, user id and handler of the update being handled (see
+LogContextMiddleware), and chatty loggers can be sampled.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+from bot.config import LoggingConfig
+
+# update_id / user_id / handler of the update being handled
+log_context: ContextVar[dict | None] = ContextVar("log_context", default=None)
+
+_CONTEXT_FIELDS = ("update_id", "user_id", "handler")
+_exc_formatter = logging.Formatter()
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name in _CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Passes only a share of INFO and DEBUG records from the given loggers.
+
+    `rates` maps a logger name (children included) to the share kept,
+    e.g. {"aiogram.event": 0.1}. Warnings and errors always pass.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+class _ContextQueueHandler(QueueHandler):
+    """Stamps the update context on the record and queues it, already rendered."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        context = log_context.get()
+        if context:
+            for name in _CONTEXT_FIELDS:
+                setattr(record, name, context.get(name))
+        # Like QueueHandler.prepare, but the traceback stays in exc_text
+        # instead of being glued onto the message
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """`"aiogram.event=0.1,bot.services.chat=0.05"` -> {name: rate}."""
+    rates = {}
+    for part in spec.split(","):
+        name, _, rate = part.strip().partition("=")
+        if name and rate:
+            rates[name] = float(rate)
+    return rates
+
+
+def setup_logging(config: LoggingConfig) -> QueueListener:
+    """Route the root logger through a queue; the listener is stopped (flushed) at exit."""
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter() if config.format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _ContextQueueHandler(log_queue)
+    rates = parse_sample_rates(config.sample)
+    if rates:
+        handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(config.level.upper())
+
+    listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
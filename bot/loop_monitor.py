@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from bot.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_lag_seconds = registry.histogram(
+    "event_loop_lag_seconds",
+    "How late the loop monitor's timer fired",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+).labels()
+_lag_quantiles = registry.gauge(
+    "event_loop_lag_quantile_seconds", "Loop lag percentiles over the last minute", ("quantile",)
+)
+_stalls = registry.counter(
+    "event_loop_stalls_total", "Times the loop was held longer than the stall threshold", ("handler",)
+)
+
+QUANTILES = (0.5, 0.9, 0.99, 1.0)
+
+
+def _blocking_code(frame) -> str:
+    """Innermost handler (else innermost bot function) on a stack."""
+    fallback = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("bot.handlers."):
+            return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_qualname}"
+        if fallback is None and module.startswith("bot.") and module != __name__:
+            fallback = f"{module}.{frame.f_code.co_qualname}"
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+class LoopMonitor:
+    """
+    Measures event loop scheduling lag and catches whatever blocks the loop.
+
+    A coroutine sleeps `interval` seconds in a loop; how late it wakes up is
+    the lag. A watchdog thread watches the coroutine's heartbeat: once it is
+    `threshold` overdue the loop is stuck in some synchronous code, and the
+    watchdog samples the loop thread's stack right then. When the loop comes
+    back the stall is logged with its length, the handler and the sample.
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.2, window: float = 60):
+        self.interval = interval
+        self.threshold = threshold
+        self._lags: deque[float] = deque(maxlen=max(int(window / interval), 1))
+        self._heartbeat = time.monotonic()
+        self._sample: tuple[str, str] | None = None
+        self._loop_thread_id: int | None = None
+        self._stop = threading.Event()
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self) -> None:
+        ticks = 0
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(now - started - self.interval, 0.0)
+            _lag_seconds.observe(lag)
+            self._lags.append(lag)
+            if lag >= self.threshold:
+                self._report(lag)
+            ticks += 1
+            if ticks % 10 == 0:
+                self._export_quantiles()
+
+    def _report(self, lag: float) -> None:
+        sample, self._sample = self._sample, None
+        if sample is None:
+            # Shorter than the watchdog's poll: no stack, only the length
+            _stalls.inc(handler="unknown")
+            logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms")
+            return
+        handler, stack = sample
+        _stalls.inc(handler=handler)
+        logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms in {handler}:\n{stack}")
+
+    def _export_quantiles(self) -> None:
+        lags = sorted(self._lags)
+        for q in QUANTILES:
+            index = min(int(q * len(lags)), len(lags) - 1)
+            _lag_quantiles.set(lags[index], quantile=f"{q:g}")
+
+    def _watch(self) -> None:
+        """Watchdog thread: sample the loop's stack once per stall."""
+        sampled_beat = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._heartbeat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue < self.threshold or beat == sampled_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            sample = (_blocking_code(frame), "".join(traceback.format_stack(frame)[-12:]))
+            if self._heartbeat == beat:  # still the same stall
+                sampled_beat = beat
+                self._sample = sample
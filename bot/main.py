@@ -1,82 +1,329 @@
 import asyncio
 import logging
 
+# First: the startup timeline counts the imports below
+from bot.startup_timeline import STARTUP_PROFILE, timeline
+
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.base import BaseStorage
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from bot.config import load_config
-from bot.db.engine import Base, create_engine, create_session_pool
+from bot.config import Config, load_config
+from bot.db.engine import create_engine, create_session_pool
+from bot.db.profiling import query_report
 from bot.handlers import get_all_routers
-from bot.middlewares import DbSessionMiddleware
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+from bot.log import setup_logging
+from bot.loop_monitor import LoopMonitor
+from bot.middlewares import (
+    AdmissionMiddleware,
+    DbSessionMiddleware,
+    HandlerMetricsMiddleware,
+    InFlightMiddleware,
+    LogContextMiddleware,
+    QueryProfilingMiddleware,
+    ReachabilityMiddleware,
+    UpdateMetricsMiddleware,
+    UserOrderingMiddleware,
 )
+from bot.monitoring import (
+    ApiMetricsMiddleware,
+    refresh_gauges,
+    start_metrics_server,
+    task_failed,
+    task_succeeded,
+)
+from bot.services.admission import admission
+from bot.services.broadcast import BroadcastEngine
+from bot.services.leaderboard import leaderboard
+from bot.services.media_group import MediaGroupCollector
+from bot.services.reachability import reachability
+from bot.services.rollups import rollups
+from bot.services.vip_expiry import vip_expiry
+from bot.shutdown import FLUSH_TIMEOUT, ShutdownSequence, cancel_tasks
+from bot.startup import prepare
+from bot.storage import MySQLStorage, TTLMemoryStorage, create_storage
+from bot.webhook import check_config as check_webhook_config, run_webhook
+
 logger = logging.getLogger(__name__)
 
+timeline.mark("imports")
+
+
+def create_dispatcher(
+    config: Config,
+    storage: BaseStorage,
+    session_pool: async_sessionmaker[AsyncSession],
+) -> tuple[Dispatcher, list[str]]:
+    """Dispatcher with every router, middleware and workflow object. Returns it and the update types to ask for."""
+    dp = Dispatcher(storage=storage)
+
+    for router in get_all_routers():
+        dp.include_router(router)
+    # my_chat_member carries block/unblock events for ReachabilityMiddleware
+    allowed_updates = dp.resolve_used_update_types() + ["my_chat_member"]
+
+    # First, so dropped and queued updates are counted too
+    dp.update.outer_middleware(UpdateMetricsMiddleware(allowed_updates))
+    # Shutdown waits for these, including updates still queued in a user's mailbox
+    in_flight = InFlightMiddleware()
+    dp.update.outer_middleware(in_flight)
+    dp["in_flight"] = in_flight
+    log_context = LogContextMiddleware()
+    dp.update.outer_middleware(log_context)
+    # One update per user at a time; different users still run in parallel
+    dp.update.outer_middleware(UserOrderingMiddleware(max_depth=config.user_mailbox_depth))
+    # Bounded wait for a DB slot, relays and /stop first
+    dp.update.middleware(AdmissionMiddleware(admission))
+    query_profiling = None
+    if config.db.query_profile:
+        query_report.budget = config.db.query_budget
+        query_report.repeat_threshold = config.db.query_repeat_threshold
+        query_profiling = QueryProfilingMiddleware(query_report)
+        dp.update.middleware(query_profiling)
+    dp.update.middleware(DbSessionMiddleware(session_pool))
+    dp.update.middleware(ReachabilityMiddleware())
+    handler_metrics = HandlerMetricsMiddleware()
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(handler_metrics)
+            observer.middleware(log_context)
+            if query_profiling is not None:
+                observer.middleware(query_profiling)
+
+    dp["bot_username"] = config.bot_username
+    dp["broadcaster"] = BroadcastEngine(
+        session_pool,
+        rate=config.broadcast_rate,
+        concurrency=config.broadcast_concurrency,
+    )
+    dp["media_groups"] = MediaGroupCollector(session_pool, delay=config.album_delay)
+    if STARTUP_PROFILE:
+        dp.update.outer_middleware(timeline.middleware)
+    return dp, allowed_updates
+
 
 async def main():
     config = load_config()
+    # Before anything logs: records go through a queue to a writer thread
+    setup_logging(config.logging)
+    timeline.mark("config + logging")
+    if config.webhook.enabled:
+        # Fail before connecting to anything rather than after startup
+        check_webhook_config(config.webhook)
 
-    engine = create_engine(config.db.url)
+    loop_monitor = None
+    if config.loop_monitor_interval:
+        loop_monitor = LoopMonitor(config.loop_monitor_interval, config.loop_stall_threshold)
+        loop_monitor.start()
 
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    engine = create_engine(
+        config.db.url,
+        pool_size=config.db.pool_size,
+        max_overflow=config.db.max_overflow,
+        slow_query_ms=config.db.slow_query_ms,
+        slow_checkout_ms=config.db.slow_checkout_ms,
+    )
+    db_slots = config.db.pool_size + config.db.max_overflow - config.admission_reserve
+    if config.fsm.backend == "mysql":
+        # MySQLStorage opens its own session per state read/write, outside admission:
+        # an admitted update may hold two connections at once
+        db_slots //= 2
+    admission.resize(db_slots)
+    timeline.mark("engine")
 
     session_pool = create_session_pool(engine)
-
-    # Seed defaults
-    from bot.db.repositories import InterestRepo, VipPlanRepo, RoomRepo
-    async with session_pool() as session:
-        await InterestRepo(session).seed_defaults()
-        await VipPlanRepo(session).seed_defaults()
-        await RoomRepo(session).seed_defaults()
-        await session.commit()
+    # Schema/seeds only when their version markers are behind; caches and pool warmed concurrently
+    await prepare(engine, session_pool, prewarm_connections=config.db.prewarm)
 
     bot = Bot(
         token=config.bot_token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
+    bot.session.middleware(ApiMetricsMiddleware())
 
-    dp = Dispatcher(storage=MemoryStorage())
+    storage = create_storage(config, session_pool)
+    dp, allowed_updates = create_dispatcher(config, storage, session_pool)
+    timeline.mark("dispatcher + routers")
 
-    dp.update.middleware(DbSessionMiddleware(session_pool))
+    resumed = await dp["broadcaster"].resume_pending(bot)
+    if resumed:
+        logger.info(f"Resumed {resumed} unfinished broadcast(s)")
+    timeline.mark("broadcast resume")
 
-    for router in get_all_routers():
-        dp.include_router(router)
-
-    dp["bot_username"] = config.bot_username
+    # Cached on the bot: polling and handlers reuse it
+    await bot.me()
+    timeline.mark("getMe")
 
     logger.info("Bot starting...")
 
-    async def vip_cleanup_task():
-        """Background task: deactivate expired VIP every 60s."""
-        from bot.db.repositories import UserRepo as _UR
+    async def vip_resync_task():
+        """Background task: reload VIP deadlines hourly (picks up other workers' activations)."""
+        while True:
+            await asyncio.sleep(3600)
+            try:
+                async with session_pool() as s:
+                    await vip_expiry.load(s)
+                task_succeeded("vip_resync")
+            except Exception as e:
+                task_failed("vip_resync")
+                logger.error(f"VIP resync error: {e}")
+
+    async def leaderboard_refresh_task():
+        """Background task: reload stale /top boards every 5s, all boards every 5 min."""
+        ticks = 0
+        while True:
+            await asyncio.sleep(5)
+            ticks += 1
+            keys = None if ticks % 60 == 0 else leaderboard.stale_boards()
+            if keys == []:
+                task_succeeded("leaderboard_refresh")
+                continue
+            try:
+                async with session_pool() as s:
+                    await leaderboard.refresh(s, keys)
+                task_succeeded("leaderboard_refresh")
+            except Exception as e:
+                task_failed("leaderboard_refresh")
+                logger.error(f"Leaderboard refresh error: {e}")
+
+    async def rollup_flush_task():
+        """Background task: write buffered daily counters and reachability flags every 10s."""
+        while True:
+            await asyncio.sleep(10)
+            try:
+                await rollups.flush(session_pool)
+                task_succeeded("rollup_flush")
+            except Exception as e:
+                task_failed("rollup_flush")
+                logger.error(f"Rollup flush error: {e}")
+            try:
+                await reachability.flush(session_pool)
+                task_succeeded("reachability_flush")
+            except Exception as e:
+                task_failed("reachability_flush")
+                logger.error(f"Reachability flush error: {e}")
+
+    async def fsm_cleanup_task():
+        """Background task: drop expired FSM keys every 10 min (MySQL and memory storage)."""
+        while True:
+            await asyncio.sleep(600)
+            try:
+                deleted = await storage.cleanup()
+                if deleted:
+                    logger.info(f"Deleted {deleted} expired FSM record(s)")
+                task_succeeded("fsm_cleanup")
+            except Exception as e:
+                task_failed("fsm_cleanup")
+                logger.error(f"FSM cleanup error: {e}")
+
+    async def broadcast_claim_task():
+        """Background task: every minute, take over broadcasts whose process stopped renewing its lease."""
         while True:
             await asyncio.sleep(60)
+            try:
+                resumed = await dp["broadcaster"].resume_pending(bot)
+                if resumed:
+                    logger.info(f"Took over {resumed} broadcast(s)")
+                task_succeeded("broadcast_claim")
+            except Exception as e:
+                task_failed("broadcast_claim")
+                logger.error(f"Broadcast claim error: {e}")
+
+    async def metrics_refresh_task():
+        """Background task: poll queue length and active chats every 15s."""
+        while True:
             try:
                 async with session_pool() as s:
-                    count = await _UR(s).deactivate_expired_vip()
-                    await s.commit()
-                    if count:
-                        logger.info(f"Deactivated {count} expired VIP subscription(s)")
+                    await refresh_gauges(s)
+                task_succeeded("metrics_refresh")
             except Exception as e:
-                logger.error(f"VIP cleanup error: {e}")
+                task_failed("metrics_refresh")
+                logger.error(f"Metrics refresh error: {e}")
+            await asyncio.sleep(15)
 
-    cleanup = asyncio.create_task(vip_cleanup_task())
+    # Started first: a taken port fails here, before any task is running
+    metrics_server = None
+    metrics_refresh = None
+    if config.metrics.port:
+        metrics_server = await start_metrics_server(config.metrics.host, config.metrics.port)
+        metrics_refresh = asyncio.create_task(metrics_refresh_task())
+    vip_expirer = asyncio.create_task(
+        vip_expiry.run(session_pool, bot if config.vip_expiry_notify else None)
+    )
+    vip_resync = asyncio.create_task(vip_resync_task())
+    top_refresh = asyncio.create_task(leaderboard_refresh_task())
+    rollup_flush = asyncio.create_task(rollup_flush_task())
+    broadcast_claim = asyncio.create_task(broadcast_claim_task())
+    fsm_cleanup = (
+        asyncio.create_task(fsm_cleanup_task())
+        if isinstance(storage, (MySQLStorage, TTLMemoryStorage))
+        else None
+    )
+    timeline.mark("background tasks")
+    logger.info(f"Ready in {timeline.elapsed:.2f}s")
 
+    # Drains share one deadline, counted from when updates stop being accepted
+    grace = config.shutdown_timeout
+    shutdown = ShutdownSequence()
     try:
-        await dp.start_polling(
-            bot,
-            allowed_updates=dp.resolve_used_update_types(),
-        )
+        if config.webhook.enabled:
+            await run_webhook(
+                dp, bot, config.webhook, allowed_updates,
+                drain_timeout=grace,
+                on_stop=lambda: shutdown.begin(grace),
+            )
+        else:
+            # The session stays open: handlers still running and broadcast reports need it
+            await dp.start_polling(bot, allowed_updates=allowed_updates, close_bot_session=False)
     finally:
-        cleanup.cancel()
-        await engine.dispose()
-        await bot.session.close()
+        # No more updates are fetched at this point. Handlers first, since they
+        # feed the buffers; then everything that writes; the session and the
+        # engine go last. Whole shutdown: at most SHUTDOWN_TIMEOUT + FLUSH_TIMEOUT.
+        logger.info("Bot stopping...")
+        shutdown.begin(grace)
+
+        async def drain_updates():
+            left = await dp["in_flight"].wait_idle(shutdown.remaining())
+            if left:
+                logger.warning(f"{left} update(s) still running at the shutdown deadline")
+
+        async def drain_albums():
+            left = await dp["media_groups"].drain(shutdown.remaining())
+            if left:
+                logger.warning(f"{left} album(s) still being relayed at the shutdown deadline")
+
+        async def suspend_broadcasts():
+            # A second is kept to cancel jobs that miss their checkpoint
+            suspended = await dp["broadcaster"].suspend_all(max(shutdown.remaining() - 1, 0))
+            if suspended:
+                logger.info(f"Suspended {suspended} broadcast(s) until next start")
+
+        async def log_query_report():
+            logger.info(f"Query profile by handler:\n{query_report.summary()}")
+
+        background = [
+            vip_expirer, vip_resync, top_refresh, rollup_flush, broadcast_claim, fsm_cleanup, metrics_refresh,
+        ]
+        await shutdown.step("in-flight updates", drain_updates())
+        await shutdown.step("albums", drain_albums())
+        # Never skipped: jobs must stop before the session closes, even past the deadline
+        await shutdown.step("broadcasts", suspend_broadcasts(), max(shutdown.remaining(), 2))
+        shutdown.set_deadline(FLUSH_TIMEOUT)
+        await shutdown.step("background tasks", cancel_tasks([t for t in background if t is not None]))
+        await shutdown.step("rollups flush", rollups.flush(session_pool))
+        await shutdown.step("reachability flush", reachability.flush(session_pool))
+        if config.db.query_profile:
+            await shutdown.step("query report", log_query_report())
+        if metrics_server is not None:
+            await shutdown.step("metrics server", metrics_server.cleanup())
+        if loop_monitor is not None:
+            loop_monitor.stop()
+        await shutdown.step("FSM storage", storage.close())
+        await shutdown.step("bot session", bot.session.close())
+        await shutdown.step("DB engine", engine.dispose())
+        logger.info(shutdown.report())
 
 
 if __name__ == "__main__":
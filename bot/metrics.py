@@ -0,0 +1,225 @@
+"""
+Minimal in-process metrics registry.
+
+Counters, gauges and histograms keyed by label values, rendered in the
+Prometheus text exposition format. No external dependency, nothing is sent
+anywhere: the registry is only read when something asks for `render()`.
+
+Everything runs on the event loop, so updates are plain dict/list writes
+without locks. Hot paths bind their labels once with `labels()` and keep
+the child, which skips the label lookup on every call.
+"""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    # repr keeps full precision (timestamps); whole numbers drop the ".0"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not labelnames:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def remove(self, **labels) -> None:
+        self._values.pop(self._key(labels), None)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("_values", "_key")
+
+    def __init__(self, values: dict, key: tuple[str, ...]):
+        self._values = values
+        self._key = key
+        values.setdefault(key, 0.0)
+
+    def inc(self, amount: float = 1) -> None:
+        self._values[self._key] += amount
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def labels(self, **labels) -> _CounterChild:
+        """Series bound to `labels`, created at 0 so it is exported before the first inc."""
+        return _CounterChild(self._values, self._key(labels))
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set_function(self, function) -> None:
+        """Read the (unlabelled) value from `function()` at render time."""
+        self._function = function
+
+    def render(self) -> list[str]:
+        if self._function is not None:
+            self._values[()] = float(self._function())
+        return super().render()
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_series")
+
+    def __init__(self, buckets: tuple[float, ...], series: list[float]):
+        self._buckets = buckets
+        self._series = series
+
+    def observe(self, value: float) -> None:
+        _observe(self._buckets, self._series, value)
+
+
+def _observe(buckets: tuple[float, ...], series: list[float], value: float) -> None:
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            series[i] += 1
+            break
+    else:
+        series[len(buckets)] += 1
+    series[-1] += value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def _get_series(self, key: tuple[str, ...]) -> list[float]:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+        return series
+
+    def observe(self, value: float, **labels) -> None:
+        _observe(self.buckets, self._get_series(self._key(labels)), value)
+
+    def labels(self, **labels) -> _HistogramChild:
+        return _HistogramChild(self.buckets, self._get_series(self._key(labels)))
+
+    def get(self, **labels) -> float:
+        """Number of observations."""
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0.0
+
+    def quantile(self, q: float, **labels) -> float | None:
+        """Upper bucket bound holding the q-th observation (None if empty)."""
+        series = self._series.get(self._key(labels))
+        if not series:
+            return None
+        target = q * sum(series[:-1])
+        seen = 0.0
+        for bound, count in zip(self.buckets, series):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def remove(self, **labels) -> None:
+        self._series.pop(self._key(labels), None)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for key, series in self._series.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labelnames + ("le",), key + (le,))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = Histogram.DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
@@ -1,3 +1,20 @@
+from bot.middlewares.admission import AdmissionMiddleware
 from bot.middlewares.db import DbSessionMiddleware
+from bot.middlewares.in_flight import InFlightMiddleware
+from bot.middlewares.log_context import LogContextMiddleware
+from bot.middlewares.metrics import HandlerMetricsMiddleware, UpdateMetricsMiddleware
+from bot.middlewares.ordering import UserOrderingMiddleware
+from bot.middlewares.profiling import QueryProfilingMiddleware
+from bot.middlewares.reachability import ReachabilityMiddleware
 
-__all__ = ["DbSessionMiddleware"]
+__all__ = [
+    "AdmissionMiddleware",
+    "DbSessionMiddleware",
+    "HandlerMetricsMiddleware",
+    "InFlightMiddleware",
+    "LogContextMiddleware",
+    "QueryProfilingMiddleware",
+    "ReachabilityMiddleware",
+    "UpdateMetricsMiddleware",
+    "UserOrderingMiddleware",
+]
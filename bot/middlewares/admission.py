@@ -0,0 +1,76 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update
+
+from bot.keyboards.inline import main_menu_keyboard
+from bot.services.admission import AdmissionController, Priority
+
+logger = logging.getLogger(__name__)
+
+_HIGH_COMMANDS = ("/stop", "/next")
+_MENU_TEXTS = frozenset(
+    button.text for row in main_menu_keyboard().keyboard for button in row
+)
+BUSY_TEXT = "⏳ Бот сейчас перегружен, повторите через пару секунд."
+
+
+def classify(update: Update) -> Priority:
+    """Chat relays and /stop, /next go first; menus, commands and callbacks after."""
+    message = update.message
+    if message is None:
+        return Priority.NORMAL
+    text = message.text or ""
+    if text.startswith("/"):
+        command = text.split(maxsplit=1)[0].split("@", 1)[0]
+        return Priority.HIGH if command in _HIGH_COMMANDS else Priority.NORMAL
+    if text in _MENU_TEXTS:
+        return Priority.NORMAL
+    return Priority.HIGH
+
+
+class AdmissionMiddleware(BaseMiddleware):
+    """
+    Holds a DB slot from the admission controller for the whole update.
+
+    Updates wait at most `high_wait` / `normal_wait` seconds for a slot; past
+    that the user gets a short "busy" answer instead of a pool timeout.
+    """
+
+    def __init__(
+        self,
+        controller: AdmissionController,
+        high_wait: float = 10,
+        normal_wait: float = 3,
+    ):
+        super().__init__()
+        self.controller = controller
+        self.waits = {Priority.HIGH: high_wait, Priority.NORMAL: normal_wait}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        priority = classify(event) if isinstance(event, Update) else Priority.NORMAL
+        if not await self.controller.acquire(priority, timeout=self.waits[priority]):
+            logger.warning(f"Update dropped: no DB slot ({priority.name})")
+            await self._answer_busy(event)
+            return None
+        try:
+            return await handler(event, data)
+        finally:
+            self.controller.release()
+
+    @staticmethod
+    async def _answer_busy(event: TelegramObject) -> None:
+        inner = event.event if isinstance(event, Update) else event
+        try:
+            if isinstance(inner, CallbackQuery):
+                await inner.answer(BUSY_TEXT)
+            elif isinstance(inner, Message):
+                await inner.answer(BUSY_TEXT)
+        except Exception:
+            pass
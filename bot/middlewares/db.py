@@ -4,6 +4,67 @@ from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from bot.metrics import registry
+
+_sessions = registry.counter(
+    "db_update_sessions_total",
+    "Per-update DB sessions by outcome: unused, read_only, committed, rolled_back",
+    ("outcome",),
+)
+
+
+class LazySession:
+    """
+    Stand-in for the update's AsyncSession that creates it on first use.
+
+    Any attribute access (execute, add, commit, ...) opens the real session,
+    so handlers and repositories use it exactly like an AsyncSession.
+    """
+
+    def __init__(self, session_pool: async_sessionmaker[AsyncSession]):
+        self._session_pool = session_pool
+        self._session: AsyncSession | None = None
+
+    def _get(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_pool()
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get(), name)
+
+    @property
+    def has_writes(self) -> bool:
+        """Anything written or pending since the last commit/rollback."""
+        if self._session is None:
+            return False
+        sync = self._session.sync_session
+        return sync.has_writes or bool(sync.new or sync.dirty or sync.deleted)
+
+    async def finish(self) -> None:
+        """Commit if the handler wrote something, then release the connection."""
+        if self._session is None:
+            _sessions.inc(outcome="unused")
+            return
+        try:
+            if self.has_writes:
+                await self._session.commit()
+                _sessions.inc(outcome="committed")
+            else:
+                # Read-only: closing rolls back on return to the pool, no COMMIT needed
+                _sessions.inc(outcome="read_only")
+        finally:
+            await self._session.close()
+
+    async def abort(self) -> None:
+        if self._session is None:
+            return
+        try:
+            await self._session.rollback()
+            _sessions.inc(outcome="rolled_back")
+        finally:
+            await self._session.close()
+
 
 class DbSessionMiddleware(BaseMiddleware):
     def __init__(self, session_pool: async_sessionmaker[AsyncSession]):
@@ -16,12 +77,12 @@ class DbSessionMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        async with self.session_pool() as session:
-            data["session"] = session
-            try:
-                result = await handler(event, data)
-                await session.commit()
-                return result
-            except Exception:
-                await session.rollback()
-                raise
+        session = LazySession(self.session_pool)
+        data["session"] = session
+        try:
+            result = await handler(event, data)
+            await session.finish()
+            return result
+        except Exception:
+            await session.abort()
+            raise
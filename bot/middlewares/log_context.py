@@ -0,0 +1,41 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject, Update, User
+
+from bot.log import log_context
+from bot.middlewares.metrics import handler_name
+
+
+class LogContextMiddleware(BaseMiddleware):
+    """
+    Puts the update id, user id and handler into every log record of an update.
+
+    Register the same instance as an outer `update` middleware (after
+    aiogram's own, which resolves the user) and on the event observers,
+    where the chosen handler becomes known.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            context = log_context.get()
+            handler_object: HandlerObject | None = data.get("handler")
+            if context is not None and handler_object is not None:
+                context["handler"] = handler_name(handler_object.callback)
+            return await handler(event, data)
+
+        user: User | None = data.get("event_from_user")
+        token = log_context.set({
+            "update_id": event.update_id,
+            "user_id": user.id if user else None,
+        })
+        try:
+            return await handler(event, data)
+        finally:
+            log_context.reset(token)
@@ -0,0 +1,105 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject, Update
+
+from bot.metrics import registry
+
+_updates = registry.counter("updates_total", "Updates received, by type", ("type",))
+_update_seconds = registry.histogram(
+    "update_seconds", "Time from receiving an update to its handler returning", ("type",)
+)
+_handler_seconds = registry.histogram(
+    "handler_seconds", "Handler latency, middlewares after routing included", ("handler",)
+)
+_handler_errors = registry.counter(
+    "handler_errors_total", "Handlers that raised", ("handler",)
+)
+
+
+def handler_name(callback: Callable) -> str:
+    """`module.function` of a handler callback, e.g. `chat.relay_text`."""
+    module = getattr(callback, "__module__", "") or ""
+    return f"{module.rsplit('.', 1)[-1]}.{getattr(callback, '__qualname__', repr(callback))}"
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Outer `update` middleware: counts updates by type and times them end to end.
+
+    Registered first, so updates dropped or queued by later middlewares are
+    still counted and their waiting is part of the latency.
+    """
+
+    def __init__(self, update_types: list[str] | None = None):
+        self._series: dict[str, tuple] = {}
+        # Pre-allocated so every allowed type is exported (as 0) from the start
+        for update_type in update_types or ():
+            self._child(update_type)
+
+    def _child(self, update_type: str):
+        children = self._series.get(update_type)
+        if children is None:
+            children = self._series[update_type] = (
+                _updates.labels(type=update_type),
+                _update_seconds.labels(type=update_type),
+            )
+        return children
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+        counter, latency = self._child(event.event_type)
+        counter.inc()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            latency.observe(time.perf_counter() - started)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Inner middleware for event observers (message, callback_query, ...):
+    latency and errors per handler function. Inner middlewares of the
+    dispatcher apply to the handlers of every included router.
+    """
+
+    def __init__(self):
+        self._series: dict[Callable, tuple] = {}
+
+    def _child(self, callback: Callable):
+        children = self._series.get(callback)
+        if children is None:
+            name = handler_name(callback)
+            children = self._series[callback] = (
+                _handler_seconds.labels(handler=name),
+                _handler_errors.labels(handler=name),
+            )
+        return children
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object: HandlerObject | None = data.get("handler")
+        if handler_object is None:
+            return await handler(event, data)
+        latency, errors = self._child(handler_object.callback)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
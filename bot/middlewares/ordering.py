@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from bot.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_queued = registry.gauge("update_mailbox_queued", "Updates waiting behind another update of the same user")
+_mailboxes = registry.gauge("update_mailboxes", "Users with an update in progress")
+_max_depth = registry.gauge("update_mailbox_max_depth", "Deepest per-user mailbox right now")
+_serialized = registry.counter("updates_serialized_total", "Updates that had to wait for the same user")
+_dropped = registry.counter("updates_dropped_total", "Updates dropped because the user's mailbox was full")
+
+
+class _Mailbox:
+    __slots__ = ("lock", "depth")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.depth = 0  # updates holding or waiting for the lock
+
+
+class UserOrderingMiddleware(BaseMiddleware):
+    """
+    Runs updates of one user strictly one after another, different users in parallel.
+
+    Outer middleware on `dp.update`, after aiogram's own user context one.
+    Each user with work in flight gets a mailbox (a lock, FIFO for waiters)
+    that is dropped as soon as it drains, so memory follows active users
+    only. Updates beyond `max_depth` queued for one user are dropped. The
+    FSM state is re-read once the lock is held.
+    """
+
+    def __init__(self, max_depth: int = 50):
+        super().__init__()
+        self.max_depth = max_depth
+        self._mailboxes: dict[int, _Mailbox] = {}
+        _mailboxes.set_function(lambda: len(self._mailboxes))
+        _max_depth.set_function(
+            lambda: max((m.depth for m in self._mailboxes.values()), default=0)
+        )
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        mailbox = self._mailboxes.get(user.id)
+        if mailbox is None:
+            mailbox = self._mailboxes[user.id] = _Mailbox()
+        elif mailbox.depth >= self.max_depth:
+            _dropped.inc()
+            logger.warning(f"Mailbox of {user.id} is full, update dropped")
+            return None
+
+        mailbox.depth += 1
+        waiting = mailbox.lock.locked()
+        if waiting:
+            _serialized.inc()
+            _queued.inc()
+        try:
+            async with mailbox.lock:
+                if waiting:
+                    _queued.dec()
+                    waiting = False
+                # aiogram's FSM middleware runs before this one and read the state
+                # before the lock: an update of this user that finished meanwhile
+                # may have changed it, and StateFilter must see the current one
+                state = data.get("state")
+                if state is not None:
+                    data["raw_state"] = await state.get_state()
+                return await handler(event, data)
+        finally:
+            if waiting:  # cancelled while queued
+                _queued.dec()
+            mailbox.depth -= 1
+            if mailbox.depth == 0:
+                del self._mailboxes[user.id]
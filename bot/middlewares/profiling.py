@@ -0,0 +1,42 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject, Update
+
+from bot.db.profiling import QueryReport, current_profile, track_queries
+from bot.middlewares.metrics import handler_name
+
+
+class QueryProfilingMiddleware(BaseMiddleware):
+    """
+    Counts SQL statements and DB time per update (debug/profiling mode).
+
+    Register the same instance on `dp.update` (before the DB session
+    middleware, so the commit is counted too) and on the event observers:
+    on an Update it opens the profile and hands it to `report` at the end,
+    on an event it tags the profile with the handler that was chosen.
+    """
+
+    def __init__(self, report: QueryReport):
+        self.report = report
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            profile = current_profile()
+            handler_object: HandlerObject | None = data.get("handler")
+            if profile is not None and handler_object is not None:
+                profile.label = handler_name(handler_object.callback)
+            return await handler(event, data)
+
+        with track_queries(f"unhandled.{event.event_type}") as profile:
+            try:
+                return await handler(event, data)
+            finally:
+                if profile.statements:
+                    self.report.add(profile)
@@ -0,0 +1,33 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User
+
+from bot.services.reachability import reachability
+
+
+class ReachabilityMiddleware(BaseMiddleware):
+    """
+    Un-flags an unreachable user as soon as they send the bot any update.
+
+    A private-chat `my_chat_member` update is the block/unblock notification
+    itself, so it sets the flag from the new status instead.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is not None:
+            member_update = event.my_chat_member if isinstance(event, Update) else None
+            if member_update is not None and member_update.chat.type == "private":
+                if member_update.new_chat_member.status == "kicked":
+                    reachability.mark_unreachable(user.id)
+                else:
+                    reachability.mark_reachable(user.id)
+            else:
+                reachability.mark_reachable(user.id)
+        return await handler(event, data)
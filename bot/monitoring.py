@@ -0,0 +1,93 @@
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import web
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.db.repositories import ChatRepo, SearchQueueRepo
+from bot.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_api_calls = registry.counter("telegram_api_calls_total", "Bot API requests", ("method",))
+_api_errors = registry.counter(
+    "telegram_api_errors_total", "Bot API requests that failed", ("method", "error")
+)
+_api_seconds = registry.histogram("telegram_api_seconds", "Bot API request latency", ("method",))
+_task_last_success = registry.gauge(
+    "background_task_last_success_timestamp_seconds",
+    "Unix time a background task last finished a run without error",
+    ("task",),
+)
+_task_failures = registry.counter(
+    "background_task_failures_total", "Background task runs that raised", ("task",)
+)
+_queue_length = registry.gauge("search_queue_length", "Users waiting in the search queue")
+_active_chats = registry.gauge("chats_active", "Chats currently in progress")
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Bot session middleware: calls, errors and latency per Bot API method."""
+
+    def __init__(self):
+        self._series: dict[str, tuple] = {}
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        children = self._series.get(name)
+        if children is None:
+            children = self._series[name] = (
+                _api_calls.labels(method=name),
+                _api_seconds.labels(method=name),
+            )
+        calls, latency = children
+        calls.inc()
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            _api_errors.inc(method=name, error=type(e).__name__)
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
+
+
+def task_succeeded(task: str) -> None:
+    _task_last_success.set(time.time(), task=task)
+
+
+def task_failed(task: str) -> None:
+    _task_failures.inc(task=task)
+
+
+async def refresh_gauges(session: AsyncSession) -> None:
+    """Queue length and active chats live in MySQL (shared by every worker), so they are polled."""
+    _queue_length.set(await SearchQueueRepo(session).queue_size())
+    _active_chats.set(await ChatRepo(session).count_active())
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        body=registry.render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Serve GET /metrics on its own port. Call `cleanup()` on the result to stop it."""
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrics on http://{host}:{port}/metrics")
+    return runner
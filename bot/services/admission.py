@@ -0,0 +1,122 @@
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator
+
+from bot.metrics import registry
+
+_rejected = registry.counter(
+    "admission_rejected_total", "Work turned away after the bounded wait", ("priority",)
+)
+_waited = registry.counter(
+    "admission_waited_total", "Work that had to queue for a DB slot", ("priority",)
+)
+_in_use = registry.gauge("admission_in_use", "DB slots held")
+_waiting = registry.gauge("admission_waiting", "Work queued for a DB slot")
+
+
+class Priority(IntEnum):
+    HIGH = 0    # chat relays, /stop, /next
+    NORMAL = 1  # menus, settings, commands
+    LOW = 2     # background broadcast work
+
+
+class AdmissionTimeout(Exception):
+    pass
+
+
+class AdmissionController:
+    """
+    Weighted semaphore sized to the DB connection pool, with priorities.
+
+    Waiters are served strictly by (priority, arrival): a free slot always
+    goes to the oldest waiter of the highest priority, and new work never
+    jumps the queue. Waiting is bounded by the caller's timeout, so a spike
+    queues for a moment instead of exhausting the pool for everyone.
+    """
+
+    def __init__(self, capacity: int = 26):
+        self.capacity = capacity
+        self._in_use = 0
+        self._seq = itertools.count()
+        # (priority, seq, weight, future); cancelled futures are skipped lazily
+        self._waiters: list[tuple[int, int, int, asyncio.Future]] = []
+        _in_use.set_function(lambda: self._in_use)
+        _waiting.set_function(lambda: sum(not w[3].done() for w in self._waiters))
+
+    def resize(self, capacity: int) -> None:
+        self.capacity = max(capacity, 1)
+        self._wake()
+
+    async def acquire(
+        self,
+        priority: Priority = Priority.NORMAL,
+        weight: int = 1,
+        timeout: float | None = None,
+    ) -> int:
+        """
+        Take `weight` slots, at most the whole capacity. Returns the weight taken,
+        which is what release() must give back, or 0 if none freed up within `timeout`.
+        """
+        weight = min(weight, self.capacity)
+        if not self._waiters and self._in_use + weight <= self.capacity:
+            self._in_use += weight
+            return weight
+
+        _waited.inc(priority=priority.name.lower())
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), weight, future))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+            return weight
+        except asyncio.TimeoutError:
+            if future.done():  # granted in the same tick the timeout fired
+                return weight
+            future.cancel()
+            self._wake()
+            _rejected.inc(priority=priority.name.lower())
+            return 0
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(weight)
+            else:
+                future.cancel()
+                self._wake()
+            raise
+
+    def release(self, weight: int = 1) -> None:
+        """Give back the weight acquire() returned; capacity may have changed since."""
+        self._in_use -= weight
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters:
+            _, _, weight, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._in_use + weight > self.capacity:
+                break
+            heapq.heappop(self._waiters)
+            self._in_use += weight
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: Priority = Priority.NORMAL,
+        weight: int = 1,
+        timeout: float | None = None,
+    ) -> AsyncIterator[None]:
+        granted = await self.acquire(priority, weight, timeout)
+        if not granted:
+            raise AdmissionTimeout(f"No DB slot within {timeout}s")
+        try:
+            yield
+        finally:
+            self.release(granted)
+
+
+admission = AdmissionController()
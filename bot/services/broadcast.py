@@ -0,0 +1,583 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable
+
+from aiogram import Bot
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.db.models import Broadcast, BroadcastStatus
+from bot.db.repositories import BroadcastRepo, UserRepo
+from bot.metrics import registry
+from bot.services.admission import Priority, admission
+from bot.services.reachability import DeliveryError, reachability
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 3
+CHUNK_SIZE = 1000
+# Seconds between progress message edits; also the rate sampling step
+PROGRESS_INTERVAL = 5
+RATE_WINDOW_SAMPLES = 6
+# A job whose owner has not checkpointed for this long may be taken over
+LEASE_SECONDS = 120
+
+_deliveries = registry.counter(
+    "broadcast_deliveries_total", "Broadcast recipients by outcome", ("result",)
+)
+_retry_after = registry.counter(
+    "broadcast_retry_after_total", "429 responses received by broadcast jobs"
+)
+_jobs_running = registry.gauge("broadcast_jobs_running", "Broadcast jobs in progress")
+_job_remaining = registry.gauge(
+    "broadcast_job_remaining", "Recipients left in a broadcast job", ("job",)
+)
+_job_rate = registry.gauge(
+    "broadcast_job_rate", "Recipients processed per second, recent window", ("job",)
+)
+_job_eta = registry.gauge(
+    "broadcast_job_eta_seconds", "Estimated time left for a broadcast job", ("job",)
+)
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600} ч {seconds % 3600 // 60} мин"
+    if seconds >= 60:
+        return f"{seconds // 60} мин {seconds % 60} сек"
+    return f"{seconds} сек"
+
+
+async def iter_recipient_chunks(
+    session_pool: async_sessionmaker[AsyncSession],
+    exclude_vip: bool = False,
+    after: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+) -> AsyncIterator[list[int]]:
+    """
+    Stream broadcast recipients in keyset-paginated chunks.
+
+    Every chunk uses its own short-lived session, so no connection stays
+    checked out while the job is sending, and memory is one chunk at most.
+    """
+    while True:
+        async with admission.slot(Priority.LOW), session_pool() as session:
+            ids = await UserRepo(session).get_telegram_ids_after(after, chunk_size, exclude_vip)
+        if not ids:
+            return
+        yield ids
+        after = ids[-1]
+        if len(ids) < chunk_size:
+            return
+
+
+class TokenBucket:
+    """
+    Rate limiter shared by all workers of one job.
+
+    A retry_after from Telegram pauses the whole bucket, not just the worker
+    that got it, since the flood limit applies to the bot as a whole.
+    """
+
+    def __init__(self, rate: float, capacity: float = 10):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+        self._updated = self._paused_until
+
+    async def acquire(self, cost: float = 1) -> None:
+        cost = min(cost, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                await asyncio.sleep((cost - self._tokens) / self.rate)
+
+
+@dataclass
+class BroadcastJob:
+    """In-memory state of a running job; mirrors a `broadcasts` row."""
+
+    id: int
+    from_chat_id: int
+    message_ids: list[int]
+    report_chat_id: int
+    exclude_vip: bool = False
+    last_telegram_id: int = 0
+    sent: int = 0
+    failed: int = 0
+    # sent + failed + recipients left, fixed when the job (re)starts
+    total: int = 0
+    # Error mix since the job (re)started: 429s are retried, not failures
+    retry_after: int = 0
+    forbidden: int = 0
+    other_errors: int = 0
+    stop_status: BroadcastStatus | None = None
+    # Set when another process took the job over; nothing more is written for it
+    lease_lost: bool = False
+    lease_renewed_at: float = field(default_factory=time.monotonic)
+    started_at: float = field(default_factory=time.monotonic)
+    progress_message_id: int | None = None
+    task: asyncio.Task | None = None
+    _samples: deque = field(default_factory=lambda: deque(maxlen=RATE_WINDOW_SAMPLES))
+
+    @classmethod
+    def from_record(cls, record: Broadcast) -> "BroadcastJob":
+        return cls(
+            id=record.id,
+            from_chat_id=record.from_chat_id,
+            message_ids=[int(m) for m in record.message_ids.split(",")],
+            report_chat_id=record.report_chat_id,
+            exclude_vip=record.exclude_vip,
+            last_telegram_id=record.last_telegram_id,
+            sent=record.sent_count,
+            failed=record.failed_count,
+        )
+
+    @property
+    def label(self) -> str:
+        return "без VIP" if self.exclude_vip else "всем"
+
+    @property
+    def is_album(self) -> bool:
+        return len(self.message_ids) > 1
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def remaining(self) -> int:
+        return max(self.total - self.processed, 0)
+
+    def sample(self) -> None:
+        self._samples.append((time.monotonic(), self.processed))
+
+    @property
+    def rate(self) -> float:
+        """Recipients per second over the last few progress samples."""
+        if len(self._samples) < 2:
+            return 0.0
+        (t0, p0), (t1, p1) = self._samples[0], self._samples[-1]
+        return (p1 - p0) / (t1 - t0) if t1 > t0 else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        rate = self.rate
+        return self.remaining / rate if rate > 0 else None
+
+    def progress_text(self, status_line: str = "идёт") -> str:
+        kind = "альбома " if self.is_album else ""
+        eta = self.eta
+        lines = [
+            f"📢 Рассылка {kind}#{self.id} ({self.label}) — {status_line}",
+            "",
+            f"📨 Доставлено: {self.sent}",
+            f"❌ Ошибок: {self.failed} (🚫 заблокировали: {self.forbidden}, прочие: {self.other_errors})",
+            f"🐢 Ответов 429 (повторено): {self.retry_after}",
+            f"⏳ Осталось: {self.remaining}",
+            f"⚡ Скорость: {self.rate:.1f} сообщ/с",
+            f"🕒 ETA: {_format_duration(eta) if eta is not None else '—'}",
+        ]
+        return "\n".join(lines)
+
+
+class BroadcastEngine:
+    """
+    Runs broadcasts as detached, resumable background jobs.
+
+    Each job feeds recipients to `concurrency` workers that share one token
+    bucket, so the send rate stays at `rate` msg/s regardless of API latency.
+    Content is copied from the admin's chat by message id, and a checkpoint
+    (every recipient <= last_telegram_id is done) is committed after every
+    chunk, so a restarted bot resumes the job instead of re-sending it.
+
+    Several processes may share the database: a job is run only by the
+    process that claimed it (`owner`), and the claim is a lease renewed with
+    every checkpoint. A job whose lease has expired, because its process died
+    or was stopped mid-chunk, is picked up by the next resume_pending().
+    A job that crashes is paused and released instead: /bcresume restarts it.
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        rate: float = 25,
+        concurrency: int = 10,
+    ):
+        self.session_pool = session_pool
+        self.rate = rate
+        self.concurrency = concurrency
+        self.jobs: dict[int, BroadcastJob] = {}
+        self.owner = f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Set by suspend_all(): jobs released at shutdown must not be claimed back
+        self.stopping = False
+
+    @staticmethod
+    def _lease_until() -> datetime:
+        return datetime.now() + timedelta(seconds=LEASE_SECONDS)
+
+    # ─── Job control ───
+
+    async def create(
+        self,
+        bot: Bot,
+        from_chat_id: int,
+        message_ids: list[int],
+        report_chat_id: int,
+        exclude_vip: bool = False,
+    ) -> BroadcastJob:
+        """Persist a new job and start it in the background."""
+        async with self.session_pool() as session:
+            record = await BroadcastRepo(session).create(
+                from_chat_id, message_ids, report_chat_id, exclude_vip,
+                owner=self.owner, lease_until=self._lease_until(),
+            )
+            await session.commit()
+        return self._start(bot, BroadcastJob.from_record(record))
+
+    async def resume_pending(self, bot: Bot) -> int:
+        """
+        Claim and restart RUNNING jobs no live process holds (left by a
+        stopped or dead process). Safe to call from every process and
+        repeatedly: each job is claimed by one. Returns count.
+        """
+        resumed = 0
+        if self.stopping:
+            return resumed
+        async with self.session_pool() as session:
+            repo = BroadcastRepo(session)
+            for record in await repo.get_by_status(BroadcastStatus.RUNNING):
+                # Ours but not running: its crash could not be recorded, leave it to the admin
+                if record.id in self.jobs or record.owner == self.owner:
+                    continue
+                claimed = await repo.claim(record.id, self.owner, self._lease_until())
+                await session.commit()
+                if not claimed:
+                    continue
+                # Progress as of the claim: the previous owner may have checkpointed since the read
+                await session.refresh(record)
+                self._start(bot, BroadcastJob.from_record(record))
+                logger.info(f"Resuming broadcast #{record.id} after telegram_id {record.last_telegram_id}")
+                resumed += 1
+        return resumed
+
+    async def resume(self, bot: Bot, job_id: int) -> BroadcastJob | None:
+        """Continue a paused job from its checkpoint."""
+        if job_id in self.jobs:
+            return None
+        async with self.session_pool() as session:
+            repo = BroadcastRepo(session)
+            claimed = await repo.claim(
+                job_id, self.owner, self._lease_until(), status=BroadcastStatus.PAUSED
+            )
+            await session.commit()
+            record = await repo.get_by_id(job_id) if claimed else None
+        if record is None:
+            return None
+        return self._start(bot, BroadcastJob.from_record(record))
+
+    def pause(self, job_id: int) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job.stop_status = BroadcastStatus.PAUSED
+        return True
+
+    async def cancel(self, job_id: int) -> bool:
+        """
+        Cancel a job run here, paused, or RUNNING elsewhere: another process
+        (or a dead one's leftover) loses the job at its next checkpoint.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.stop_status = BroadcastStatus.CANCELLED
+            return True
+        async with self.session_pool() as session:
+            cancelled = await BroadcastRepo(session).cancel(job_id)
+            await session.commit()
+        return cancelled
+
+    async def suspend_all(self, timeout: float) -> int:
+        """
+        Stop every job at a checkpoint for shutdown, leaving it RUNNING so
+        resume_pending() continues it on the next start. Jobs that do not
+        stop within `timeout` are cancelled; they resume from their last
+        chunk checkpoint once their lease expires. Returns the number of
+        jobs suspended.
+        """
+        self.stopping = True
+        jobs = list(self.jobs.values())
+        for job in jobs:
+            job.stop_status = BroadcastStatus.RUNNING
+        tasks = [job.task for job in jobs if job.task is not None]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return len(jobs)
+
+    def _start(self, bot: Bot, job: BroadcastJob) -> BroadcastJob:
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, bot))
+        return job
+
+    # ─── Execution ───
+
+    def _sender(self, bot: Bot, job: BroadcastJob) -> Callable[[int], Awaitable]:
+        if job.is_album:
+            return lambda uid: bot.copy_messages(uid, job.from_chat_id, job.message_ids)
+        return lambda uid: bot.copy_message(uid, job.from_chat_id, job.message_ids[0])
+
+    async def _checkpoint(self, job: BroadcastJob, status: BroadcastStatus | None = None) -> None:
+        """Save progress and renew the lease; a final `status` releases the job."""
+        if job.lease_lost:
+            return
+        try:
+            async with admission.slot(Priority.LOW), self.session_pool() as session:
+                held = await BroadcastRepo(session).save_progress(
+                    job.id, self.owner, job.last_telegram_id, job.sent, job.failed,
+                    lease_until=self._lease_until(), status=status,
+                )
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Broadcast #{job.id} checkpoint error: {e}")
+            return
+        self._lease_checked(job, held)
+
+    async def _renew_lease(self, job: BroadcastJob) -> None:
+        if job.lease_lost:
+            return
+        try:
+            async with admission.slot(Priority.LOW), self.session_pool() as session:
+                held = await BroadcastRepo(session).renew_lease(job.id, self.owner, self._lease_until())
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Broadcast #{job.id} lease renewal error: {e}")
+            return
+        self._lease_checked(job, held)
+
+    def _lease_checked(self, job: BroadcastJob, held: bool) -> None:
+        job.lease_renewed_at = time.monotonic()
+        if not held:
+            # Our lease ran out and another process resumed the job, or it was cancelled: stop sending
+            logger.warning(f"Broadcast #{job.id} was taken over or cancelled by another process, stopping")
+            job.lease_lost = True
+            job.stop_status = BroadcastStatus.RUNNING
+
+    async def _was_cancelled(self, job: BroadcastJob) -> bool:
+        """Whether a lost job was cancelled (/bccancel from another process) rather than taken over."""
+        try:
+            async with self.session_pool() as session:
+                record = await BroadcastRepo(session).get_by_id(job.id)
+        except Exception as e:
+            logger.error(f"Broadcast #{job.id} status check error: {e}")
+            return False
+        return record is not None and record.status == BroadcastStatus.CANCELLED
+
+    async def _count_remaining(self, job: BroadcastJob) -> int:
+        try:
+            async with admission.slot(Priority.LOW), self.session_pool() as session:
+                return await UserRepo(session).count_telegram_ids_after(
+                    job.last_telegram_id, job.exclude_vip
+                )
+        except Exception as e:
+            logger.error(f"Broadcast #{job.id} count error: {e}")
+            return 0
+
+    async def _edit_progress(self, job: BroadcastJob, bot: Bot, text: str) -> None:
+        if job.progress_message_id is None:
+            return
+        try:
+            await bot.edit_message_text(
+                text, chat_id=job.report_chat_id, message_id=job.progress_message_id
+            )
+        except Exception:
+            pass
+
+    async def _report_progress(self, job: BroadcastJob, bot: Bot) -> None:
+        """Keep the job's progress message and metrics current, every PROGRESS_INTERVAL."""
+        try:
+            message = await bot.send_message(job.report_chat_id, self._progress_body(job))
+            job.progress_message_id = message.message_id
+        except Exception:
+            pass
+        last_text = None
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            job.sample()
+            _job_remaining.set(job.remaining, job=job.id)
+            _job_rate.set(round(job.rate, 2), job=job.id)
+            eta = job.eta
+            if eta is not None:
+                _job_eta.set(round(eta), job=job.id)
+            # Slow chunks: keep the lease alive between chunk checkpoints
+            if time.monotonic() - job.lease_renewed_at > LEASE_SECONDS / 3:
+                await self._renew_lease(job)
+            text = self._progress_body(job)
+            # Editing with identical text is an error, and a wasted call
+            if text != last_text:
+                await self._edit_progress(job, bot, text)
+                last_text = text
+
+    def _progress_body(self, job: BroadcastJob, status_line: str = "идёт") -> str:
+        text = job.progress_text(status_line)
+        if job.id in self.jobs:
+            text += f"\n\n/bcpause {job.id} — пауза, /bccancel {job.id} — отмена"
+        return text
+
+    async def _run(self, job: BroadcastJob, bot: Bot) -> None:
+        _jobs_running.inc()
+        job.total = job.processed + await self._count_remaining(job)
+        job.sample()
+        progress = asyncio.create_task(self._report_progress(job, bot))
+
+        bucket = TokenBucket(self.rate)
+        queue: asyncio.Queue[int] = asyncio.Queue(maxsize=self.concurrency * 2)
+        send = self._sender(bot, job)
+        cost = len(job.message_ids)
+        # Dispatched but not finished; the checkpoint must stay below all of them
+        inflight: set[int] = set()
+        last_dispatched = job.last_telegram_id
+
+        def watermark() -> int:
+            return min(inflight) - 1 if inflight else last_dispatched
+
+        async def worker():
+            while True:
+                uid = await queue.get()
+                try:
+                    await self._deliver(job, bucket, send, uid, cost)
+                finally:
+                    inflight.discard(uid)
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        status: BroadcastStatus | None = None
+        crashed = False
+        try:
+            chunks = iter_recipient_chunks(self.session_pool, job.exclude_vip, after=job.last_telegram_id)
+            async for chunk in chunks:
+                for uid in chunk:
+                    if job.stop_status is not None:
+                        break
+                    last_dispatched = uid
+                    if reachability.is_blocked(uid):
+                        job.total -= 1
+                        continue  # flagged since the chunk was read
+                    inflight.add(uid)
+                    await queue.put(uid)
+                job.last_telegram_id = watermark()
+                await self._checkpoint(job)
+                if job.stop_status is not None:
+                    break
+            await queue.join()
+            job.last_telegram_id = watermark()
+            status = job.stop_status or BroadcastStatus.DONE
+        except Exception:
+            # Paused and released rather than left RUNNING: resume_pending() would
+            # restart it straight into the same error. The admin decides with /bcresume
+            logger.exception(f"Broadcast #{job.id} crashed")
+            status = BroadcastStatus.PAUSED
+            crashed = True
+        finally:
+            for w in workers:
+                w.cancel()
+            progress.cancel()
+            self.jobs.pop(job.id, None)
+            _jobs_running.dec()
+            for gauge in (_job_remaining, _job_rate, _job_eta):
+                gauge.remove(job=job.id)
+
+        await self._checkpoint(job, status)
+        if job.lease_lost and await self._was_cancelled(job):
+            status = BroadcastStatus.CANCELLED
+        elapsed = time.monotonic() - job.started_at
+        logger.info(
+            f"Broadcast #{job.id} ({job.label}) {'crashed' if crashed else status.value}: "
+            f"{job.sent} ok, {job.failed} fail in {elapsed:.0f}s"
+        )
+
+        if crashed:
+            title = f"⚠️ Рассылка #{job.id} прервана ошибкой, продолжить — /bcresume {job.id}"
+            status_line = "прервана ошибкой"
+        elif status == BroadcastStatus.DONE:
+            title = "✅ Альбом отправлен" if job.is_album else "✅ Рассылка завершена"
+            status_line = f"завершена за {_format_duration(elapsed)}"
+        elif status == BroadcastStatus.PAUSED:
+            title = f"⏸ Рассылка #{job.id} приостановлена, продолжить — /bcresume {job.id}"
+            status_line = "приостановлена"
+        elif status == BroadcastStatus.CANCELLED:
+            title = f"🛑 Рассылка #{job.id} отменена"
+            status_line = "отменена"
+        elif status == BroadcastStatus.RUNNING and job.lease_lost:
+            title = f"🔀 Рассылку #{job.id} продолжил другой процесс бота"
+            status_line = "передана другому процессу"
+        else:
+            title = f"⏯ Рассылка #{job.id} остановлена вместе с ботом и продолжится после запуска"
+            status_line = "ждёт перезапуска бота"
+        await self._edit_progress(job, bot, self._progress_body(job, status_line))
+        try:
+            await bot.send_message(
+                job.report_chat_id,
+                f"{title} ({job.label}):\n📨 {job.sent} доставлено, ❌ {job.failed} ошибок",
+            )
+        except Exception:
+            pass
+
+    async def _deliver(
+        self,
+        job: BroadcastJob,
+        bucket: TokenBucket,
+        send: Callable[[int], Awaitable],
+        uid: int,
+        cost: int,
+    ) -> None:
+        for _ in range(MAX_RETRIES + 1):
+            await bucket.acquire(cost)
+            try:
+                await send(uid)
+                job.sent += 1
+                _deliveries.inc(result="sent")
+                return
+            except Exception as e:
+                kind = reachability.on_delivery_error(uid, e)
+                if kind == DeliveryError.RETRY:
+                    job.retry_after += 1
+                    _retry_after.inc()
+                    bucket.pause(e.retry_after)
+                    continue
+                if kind == DeliveryError.PERMANENT:
+                    job.forbidden += 1
+                    _deliveries.inc(result="forbidden")
+                else:
+                    job.other_errors += 1
+                    _deliveries.inc(result="failed")
+                job.failed += 1
+                return
+        # Still rate limited after MAX_RETRIES
+        job.other_errors += 1
+        _deliveries.inc(result="failed")
+        job.failed += 1
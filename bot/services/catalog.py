@@ -0,0 +1,104 @@
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.db.repositories import InterestRepo, RoomRepo, VipPlanRepo
+
+
+@dataclass(frozen=True, slots=True)
+class InterestItem:
+    id: int
+    name: str
+    emoji: str
+
+
+@dataclass(frozen=True, slots=True)
+class RoomItem:
+    id: int
+    name: str
+    emoji: str
+    description: str | None
+    is_active: bool
+
+
+@dataclass(frozen=True, slots=True)
+class VipPlanItem:
+    id: int
+    name: str
+    duration_days: int
+    price_stars: int
+    price_ton: float | None
+    discount_text: str | None
+    emoji: str
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Immutable view of the catalog tables. Lists hold active rows only."""
+
+    interests: tuple[InterestItem, ...] = ()
+    rooms: tuple[RoomItem, ...] = ()
+    vip_plans: tuple[VipPlanItem, ...] = ()
+    # By-id lookups cover inactive rows too: older keyboards may still carry their ids
+    rooms_by_id: Mapping[int, RoomItem] = field(default_factory=lambda: MappingProxyType({}))
+    plans_by_id: Mapping[int, VipPlanItem] = field(default_factory=lambda: MappingProxyType({}))
+    # (name, emoji) pairs in the shape interests_keyboard() expects
+    interest_options: tuple[tuple[str, str], ...] = ()
+
+
+class CatalogService:
+    """
+    In-process cache of interests, rooms and VIP plans.
+
+    Loaded once at startup and swapped atomically on reload (/reload admin
+    command), so registration, profile, rooms and VIP screens need no queries.
+    """
+
+    def __init__(self):
+        self.snapshot = CatalogSnapshot()
+
+    async def reload(self, session: AsyncSession) -> CatalogSnapshot:
+        interests = await InterestRepo(session).get_all()
+        rooms = await RoomRepo(session).get_all()
+        plans = await VipPlanRepo(session).get_all()
+
+        interest_items = tuple(
+            InterestItem(id=i.id, name=i.name, emoji=i.emoji) for i in interests if i.is_active
+        )
+        room_items = [
+            RoomItem(
+                id=r.id, name=r.name, emoji=r.emoji,
+                description=r.description, is_active=r.is_active,
+            )
+            for r in rooms
+        ]
+        plan_items = [
+            VipPlanItem(
+                id=p.id, name=p.name, duration_days=p.duration_days,
+                price_stars=p.price_stars, price_ton=p.price_ton,
+                discount_text=p.discount_text, emoji=p.emoji, is_active=p.is_active,
+            )
+            for p in plans
+        ]
+
+        self.snapshot = CatalogSnapshot(
+            interests=interest_items,
+            rooms=tuple(r for r in room_items if r.is_active),
+            vip_plans=tuple(p for p in plan_items if p.is_active),
+            rooms_by_id=MappingProxyType({r.id: r for r in room_items}),
+            plans_by_id=MappingProxyType({p.id: p for p in plan_items}),
+            interest_options=tuple((i.name, i.emoji) for i in interest_items),
+        )
+        return self.snapshot
+
+    def room(self, room_id: int) -> RoomItem | None:
+        return self.snapshot.rooms_by_id.get(room_id)
+
+    def vip_plan(self, plan_id: int) -> VipPlanItem | None:
+        return self.snapshot.plans_by_id.get(plan_id)
+
+
+catalog = CatalogService()
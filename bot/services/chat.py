@@ -1,13 +1,24 @@
+import logging
 from datetime import datetime
 
 from aiogram import Bot
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.db.models import User
+from bot.db.models import Chat, MessageLog, User
 from bot.db.repositories import ChatRepo, UserRepo, MessageLogRepo
+from bot.metrics import registry
 from bot.services.matching import MatchingService
+from bot.services.leaderboard import leaderboard
+from bot.services.reachability import DeliveryError, reachability
+from bot.services.rollups import rollups
 from bot.keyboards.inline import rating_keyboard
 
+logger = logging.getLogger(__name__)
+
+_relayed = registry.counter(
+    "chat_relayed_messages_total", "Messages relayed between chat partners", ("content_type",)
+)
+
 
 class ChatService:
     def __init__(
@@ -62,8 +73,12 @@ class ChatService:
 
         try:
             await self.bot.send_message(user2_id, msg_for_user2)
-        except Exception:
-            pass
+        except Exception as e:
+            if reachability.on_delivery_error(user2_id, e) == DeliveryError.PERMANENT:
+                # Partner blocked the bot while waiting in the queue
+                await self.chat_repo.end_chat(chat.id)
+                await self.session.commit()
+                return "😔 Собеседник недоступен. Нажмите /next, чтобы найти нового."
 
         return msg_for_user1
 
@@ -126,14 +141,7 @@ class ChatService:
         await self.chat_repo.end_chat(active_chat.id)
         await self.session.commit()
 
-        try:
-            await self.bot.send_message(
-                partner_id,
-                "🔴 Собеседник завершил чат.",
-                reply_markup=rating_keyboard(chat_id),
-            )
-        except Exception:
-            pass
+        await self._notify_chat_ended(partner_id, chat_id)
 
         return (
             "🔴 Вы завершили чат.",
@@ -141,6 +149,18 @@ class ChatService:
             chat_id,
         )
 
+    async def _notify_chat_ended(self, partner_id: int, chat_id: int) -> None:
+        if reachability.is_blocked(partner_id):
+            return
+        try:
+            await self.bot.send_message(
+                partner_id,
+                "🔴 Собеседник завершил чат.",
+                reply_markup=rating_keyboard(chat_id),
+            )
+        except Exception as e:
+            reachability.on_delivery_error(partner_id, e)
+
     async def next_chat(self, user: User, room_id: int | None = None) -> str:
         active_chat = await self.chat_repo.get_active_chat(user.telegram_id)
         if active_chat:
@@ -148,14 +168,7 @@ class ChatService:
             chat_id = active_chat.id
             await self.chat_repo.end_chat(active_chat.id)
             await self.session.commit()
-            try:
-                await self.bot.send_message(
-                    partner_id,
-                    "🔴 Собеседник завершил чат.",
-                    reply_markup=rating_keyboard(chat_id),
-                )
-            except Exception:
-                pass
+            await self._notify_chat_ended(partner_id, chat_id)
 
         return await self.start_search(user, room_id=room_id)
 
@@ -176,6 +189,10 @@ class ChatService:
 
         await self.chat_repo.increment_messages(active_chat.id)
         await self.user_repo.increment_messages(telegram_id)
+        leaderboard.on_message(telegram_id)
+        rollups.add_message(telegram_id)
+        _relayed.inc(content_type=content_type)
+        logger.info(f"Relayed {content_type} in chat {active_chat.id}")
 
         # Log message
         await self.msg_log.log(
@@ -190,6 +207,40 @@ class ChatService:
 
         return partner_id
 
+    async def get_active_chat(self, telegram_id: int) -> Chat | None:
+        return await self.chat_repo.get_active_chat(telegram_id)
+
+    async def log_album(
+        self,
+        chat: Chat,
+        telegram_id: int,
+        parts: list[tuple[str, str, str | None]],
+    ) -> None:
+        """
+        Count and log a relayed album in one pass: parts are (content_type, file_id,
+        caption), and the chat was resolved once for the whole album.
+        """
+        partner_id = self.chat_repo.get_partner_id(chat, telegram_id)
+        await self.chat_repo.increment_messages(chat.id, len(parts))
+        await self.user_repo.increment_messages(telegram_id, len(parts))
+        leaderboard.on_message(telegram_id, len(parts))
+        rollups.add_message(telegram_id, len(parts))
+        for content_type, _, _ in parts:
+            _relayed.inc(content_type=content_type)
+        logger.info(f"Relayed album of {len(parts)} in chat {chat.id}")
+
+        await self.msg_log.log_many([
+            MessageLog(
+                chat_id=chat.id,
+                sender_telegram_id=telegram_id,
+                receiver_telegram_id=partner_id,
+                content_type=content_type,
+                file_id=file_id,
+                caption=caption,
+            )
+            for content_type, file_id, caption in parts
+        ])
+
     async def get_active_partner(self, telegram_id: int) -> int | None:
         active_chat = await self.chat_repo.get_active_chat(telegram_id)
         if not active_chat:
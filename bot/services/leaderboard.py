@@ -0,0 +1,227 @@
+import heapq
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.db.repositories import UserRepo, UserDailyStatRepo
+
+
+@dataclass(slots=True)
+class _Entry:
+    telegram_id: int
+    name: str
+    is_vip: bool
+    likes: int
+    dislikes: int
+    referrals: int
+    messages: int
+
+    def score(self, metric: str) -> int:
+        if metric == "karma":
+            return self.likes - self.dislikes
+        if metric == "referrals":
+            return self.referrals
+        return self.messages
+
+
+def _format_line(metric: str, e: _Entry) -> str:
+    if metric == "karma":
+        return f"👍 {e.likes} 👎 {e.dislikes} (={e.likes - e.dislikes})"
+    if metric == "referrals":
+        return f"{e.referrals} приглашённых"
+    return f"{e.messages} сообщений"
+
+
+class _Board:
+    """
+    Top-N of one metric, kept as the best `keep` rows from the last DB load.
+
+    Users outside the kept set are tracked only as score deltas: their real
+    score is at most `floor + delta`, so once that could beat the visible
+    top-N the board is marked stale and gets reloaded by the refresh task.
+    Windowed boards (`window_days`) are loaded from the daily rollups.
+    """
+
+    def __init__(
+        self,
+        metric: str,
+        title: str,
+        window_days: int | None = None,
+        min_refresh: float = 0,
+    ):
+        self.metric = metric
+        self.title = title
+        self.window_days = window_days
+        self.min_refresh = min_refresh
+        self.since: date | None = None
+        self.entries: dict[int, _Entry] = {}
+        self.floor = 0
+        self.full = False
+        self.pending: dict[int, int] = {}
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.stale = True
+        self._text: str | None = None
+        self._cutoff: int | float | None = None
+
+    def window_start(self) -> date | None:
+        if self.window_days is None:
+            return None
+        return date.today() - timedelta(days=self.window_days - 1)
+
+    def needs_refresh(self) -> bool:
+        if not self.loaded:
+            return True
+        if self.window_days is not None and self.since != self.window_start():
+            return True  # day rolled over
+        return self.stale and time.monotonic() - self.loaded_at >= self.min_refresh
+
+    def load(self, entries: list[_Entry], keep: int, since: date | None = None) -> None:
+        self.entries = {e.telegram_id: e for e in entries}
+        # If the board is full, everyone else scores at most the last row;
+        # brand-new users always start from zero.
+        self.full = len(entries) >= keep
+        last = entries[-1].score(self.metric) if self.full else 0
+        self.floor = max(last, 0)
+        self.since = since
+        self.pending = {}
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+        self.stale = False
+        self._text = None
+        self._cutoff = None
+
+    def bump(self, telegram_id: int, delta: int, top_size: int) -> None:
+        entry = self.entries.get(telegram_id)
+        if entry is not None:
+            self._text = None
+            self._cutoff = None
+            if self.full and entry.score(self.metric) < self.floor:
+                self.stale = True
+            return
+        if delta <= 0:
+            return
+        bound = self.pending.get(telegram_id, 0) + delta
+        self.pending[telegram_id] = bound
+        if self.floor + bound > self._threshold(top_size):
+            self.stale = True
+
+    def _top(self, top_size: int) -> list[_Entry]:
+        return heapq.nlargest(top_size, self.entries.values(), key=lambda e: e.score(self.metric))
+
+    def _threshold(self, top_size: int) -> int | float:
+        """Score of the last visible place (cached until a kept entry changes)."""
+        if self._cutoff is None:
+            if len(self.entries) < top_size:
+                self._cutoff = float("-inf")
+            else:
+                self._cutoff = self._top(top_size)[-1].score(self.metric)
+        return self._cutoff
+
+    def text(self, top_size: int) -> str:
+        if self._text is None:
+            lines = []
+            for i, e in enumerate(self._top(top_size), 1):
+                vip = " 👑" if e.is_vip else ""
+                lines.append(f"{i}. {e.name}{vip} — {_format_line(self.metric, e)}")
+            if not lines:
+                self._text = f"🏆 {self.title}\n\nПока никого нет в рейтинге."
+            else:
+                self._text = f"🏆 {self.title}\n\n" + "\n".join(lines)
+        return self._text
+
+
+class LeaderboardService:
+    """
+    In-process /top cache.
+
+    Boards are loaded from MySQL on a schedule and patched in memory from the
+    karma / referral / message counters, so /top never touches the DB.
+    Increments are applied before the handler's commit; any drift (rollback,
+    other workers, rollups not yet flushed) is corrected by the next refresh.
+    """
+
+    # key: (metric, title, window_days, min seconds between stale reloads)
+    BOARDS = {
+        "karma": ("karma", "👁️ Топ-10 по карме", None, 0),
+        "karma_day": ("karma", "👁️ Топ-10 по карме за сегодня", 1, 60),
+        "karma_week": ("karma", "👁️ Топ-10 по карме за неделю", 7, 60),
+        "referrals": ("referrals", "🎪 Топ-10 по рефералам", None, 0),
+        "activity": ("activity", "📧 Топ-10 по активности", None, 0),
+        "activity_day": ("activity", "📧 Топ-10 по активности за сегодня", 1, 60),
+        "activity_week": ("activity", "📧 Топ-10 по активности за неделю", 7, 60),
+    }
+
+    def __init__(self, top_size: int = 10, keep_size: int = 50):
+        self.top_size = top_size
+        self.keep_size = keep_size
+        self.boards = {key: _Board(*spec) for key, spec in self.BOARDS.items()}
+
+    async def refresh(self, session: AsyncSession, keys: list[str] | None = None) -> None:
+        user_repo = UserRepo(session)
+        stats_repo = UserDailyStatRepo(session)
+        for key in keys or list(self.boards):
+            board = self.boards[key]
+            since = board.window_start()
+            if since is None:
+                rows = await user_repo.top_rows(board.metric, self.keep_size)
+            else:
+                rows = await stats_repo.top_window(board.metric, since, self.keep_size)
+            entries = [
+                _Entry(
+                    telegram_id=r.telegram_id,
+                    name=r.first_name or r.username or str(r.telegram_id),
+                    is_vip=r.is_vip,
+                    likes=int(r.karma_likes),
+                    dislikes=int(r.karma_dislikes),
+                    referrals=getattr(r, "referral_count", 0),
+                    messages=int(r.messages_count),
+                )
+                for r in rows
+            ]
+            board.load(entries, self.keep_size, since)
+
+    def stale_boards(self) -> list[str]:
+        return [key for key, board in self.boards.items() if board.needs_refresh()]
+
+    def render(self, key: str) -> str | None:
+        """Pre-rendered /top text, or None if the board was never loaded."""
+        board = self.boards[key]
+        if not board.loaded:
+            return None
+        return board.text(self.top_size)
+
+    # ─── Incremental updates ───
+
+    def set_vip(self, telegram_id: int, is_vip: bool) -> None:
+        for board in self.boards.values():
+            entry = board.entries.get(telegram_id)
+            if entry is not None and entry.is_vip != is_vip:
+                entry.is_vip = is_vip
+                board._text = None
+
+    def _bump(self, metric: str, telegram_id: int, delta: int, field: str) -> None:
+        for board in self.boards.values():
+            if board.metric != metric:
+                continue
+            entry = board.entries.get(telegram_id)
+            if entry is not None:
+                setattr(entry, field, getattr(entry, field) + abs(delta))
+            board.bump(telegram_id, delta, self.top_size)
+
+    def on_karma(self, telegram_id: int, is_like: bool) -> None:
+        if is_like:
+            self._bump("karma", telegram_id, 1, "likes")
+        else:
+            self._bump("karma", telegram_id, -1, "dislikes")
+
+    def on_referral(self, telegram_id: int) -> None:
+        self._bump("referrals", telegram_id, 1, "referrals")
+
+    def on_message(self, telegram_id: int, count: int = 1) -> None:
+        self._bump("activity", telegram_id, count, "messages")
+
+
+leaderboard = LeaderboardService()
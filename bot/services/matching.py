@@ -1,7 +1,17 @@
+from datetime import datetime
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.models import User
 from bot.db.repositories import SearchQueueRepo
+from bot.metrics import registry
+from bot.services.reachability import reachability
+
+_time_to_match = registry.histogram(
+    "search_time_to_match_seconds",
+    "How long the matched partner waited in the search queue",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+).labels()
 
 
 class MatchingService:
@@ -24,13 +34,18 @@ class MatchingService:
         return entry is not None
 
     async def find_match(self, user: User, room_id: int | None = None) -> int | None:
-        match = await self.repo.find_match(user, room_id=room_id)
-        if match:
+        while True:
+            match = await self.repo.find_match(user, room_id=room_id)
+            if match is None:
+                return None
             matched_id = match.telegram_id
             await self.repo.remove_from_queue(matched_id)
+            if reachability.is_blocked(matched_id):
+                # Flagged but not yet flushed out of the queue
+                continue
             await self.repo.remove_from_queue(user.telegram_id)
+            _time_to_match.observe((datetime.now() - match.joined_at).total_seconds())
             return matched_id
-        return None
 
     async def queue_size(self) -> int:
         return await self.repo.queue_size()
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.services.admission import Priority, admission
+
+logger = logging.getLogger(__name__)
+
+# Telegram albums hold at most 10 items
+MAX_GROUP_SIZE = 10
+
+AlbumHandler = Callable[[list[Message], AsyncSession], Awaitable[None]]
+
+
+@dataclass
+class _PendingGroup:
+    on_complete: AlbumHandler
+    messages: list[Message] = field(default_factory=list)
+    first_seen: float = field(default_factory=time.monotonic)
+    timer: asyncio.TimerHandle | None = None
+
+
+class MediaGroupCollector:
+    """
+    Collects the parts of a media group (album) and hands them over at once.
+
+    Telegram delivers every album item as a separate update. Groups are keyed
+    by (chat_id, media_group_id); each new part re-arms a per-group timer, so
+    the group is flushed `delay` seconds after its last part (or immediately
+    at 10 parts). Everything runs on the event loop without awaiting, so no
+    lock is needed. The handler runs as a task with its own session — the
+    update's session is long closed by then.
+
+    Groups still open after `max_age` are flushed as they are, and at most
+    `max_groups` may be pending; past that the oldest is dropped.
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        delay: float = 0.5,
+        max_age: float = 10,
+        max_groups: int = 1000,
+    ):
+        self.session_pool = session_pool
+        self.delay = delay
+        self.max_age = max_age
+        self.max_groups = max_groups
+        self._groups: dict[tuple[int, str], _PendingGroup] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def add(self, message: Message, on_complete: AlbumHandler) -> None:
+        """Add an album part. `on_complete` of the first part is the one that runs."""
+        key = (message.chat.id, message.media_group_id)
+        group = self._groups.get(key)
+        if group is None:
+            self._evict()
+            group = self._groups[key] = _PendingGroup(on_complete)
+        group.messages.append(message)
+
+        if group.timer is not None:
+            group.timer.cancel()
+        loop = asyncio.get_running_loop()
+        age = time.monotonic() - group.first_seen
+        if len(group.messages) >= MAX_GROUP_SIZE or age >= self.max_age:
+            self._flush(key)
+        else:
+            delay = min(self.delay, self.max_age - age)
+            group.timer = loop.call_later(delay, self._flush, key)
+
+    def _evict(self) -> None:
+        while len(self._groups) >= self.max_groups:
+            key = next(iter(self._groups))  # dicts keep insertion order: oldest first
+            group = self._groups.pop(key)
+            if group.timer is not None:
+                group.timer.cancel()
+            logger.warning(f"Media group {key} dropped: too many pending groups")
+
+    def _flush(self, key: tuple[int, str]) -> None:
+        group = self._groups.pop(key, None)
+        if group is None:
+            return
+        if group.timer is not None:
+            group.timer.cancel()
+        messages = sorted(group.messages, key=lambda m: m.message_id)
+        task = asyncio.create_task(self._run(key, group.on_complete, messages))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self, timeout: float) -> int:
+        """Hand over every pending group now and wait for the handlers. Returns how many are still running."""
+        for key in list(self._groups):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+        return len(self._tasks)
+
+    async def _run(
+        self,
+        key: tuple[int, str],
+        on_complete: AlbumHandler,
+        messages: list[Message],
+    ) -> None:
+        # Album relays count as chat traffic
+        async with admission.slot(Priority.HIGH), self.session_pool() as session:
+            try:
+                await on_complete(messages, session)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                logger.exception(f"Media group {key} handler failed")
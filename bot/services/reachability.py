@@ -0,0 +1,102 @@
+import logging
+from enum import Enum
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.db.repositories import SearchQueueRepo, UserRepo
+
+logger = logging.getLogger(__name__)
+
+# BadRequest descriptions that mean the chat is gone for good
+_PERMANENT_BAD_REQUESTS = ("chat not found", "user is deactivated", "peer_id_invalid")
+
+
+class DeliveryError(str, Enum):
+    RETRY = "retry"            # 429, try again after retry_after
+    PERMANENT = "permanent"    # blocked / deleted account, stop sending
+    TRANSIENT = "transient"    # anything else, count and move on
+
+
+def classify_delivery_error(exc: Exception) -> DeliveryError:
+    if isinstance(exc, TelegramRetryAfter):
+        return DeliveryError.RETRY
+    if isinstance(exc, TelegramForbiddenError):
+        return DeliveryError.PERMANENT
+    if isinstance(exc, TelegramBadRequest):
+        description = exc.message.lower()
+        if any(text in description for text in _PERMANENT_BAD_REQUESTS):
+            return DeliveryError.PERMANENT
+    return DeliveryError.TRANSIENT
+
+
+class ReachabilityService:
+    """
+    Tracks users the bot can no longer deliver to.
+
+    The flagged set is loaded at startup and kept in memory, so checks on the
+    send and match paths are free. Flag changes are buffered and written by
+    `flush()` in one UPDATE per direction; flagged users are dropped from the
+    search queue in the same transaction.
+    """
+
+    def __init__(self):
+        self._blocked: set[int] = set()
+        self._to_block: set[int] = set()
+        self._to_unblock: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._blocked)
+
+    def is_blocked(self, telegram_id: int) -> bool:
+        return telegram_id in self._blocked
+
+    def mark_unreachable(self, telegram_id: int) -> None:
+        if telegram_id in self._blocked:
+            return
+        self._blocked.add(telegram_id)
+        self._to_block.add(telegram_id)
+        self._to_unblock.discard(telegram_id)
+        logger.info(f"User {telegram_id} is unreachable, flagged")
+
+    def mark_reachable(self, telegram_id: int) -> None:
+        if telegram_id not in self._blocked:
+            return
+        self._blocked.discard(telegram_id)
+        self._to_unblock.add(telegram_id)
+        self._to_block.discard(telegram_id)
+        logger.info(f"User {telegram_id} is back, unflagged")
+
+    def on_delivery_error(self, telegram_id: int, exc: Exception) -> DeliveryError:
+        """Classify a send failure and flag the recipient if it is permanent."""
+        kind = classify_delivery_error(exc)
+        if kind == DeliveryError.PERMANENT:
+            self.mark_unreachable(telegram_id)
+        return kind
+
+    async def load(self, session: AsyncSession) -> int:
+        self._blocked = set(await UserRepo(session).get_blocked_ids())
+        return len(self._blocked)
+
+    async def flush(self, session_pool: async_sessionmaker[AsyncSession]) -> None:
+        block, unblock = self._to_block, self._to_unblock
+        if not block and not unblock:
+            return
+        self._to_block, self._to_unblock = set(), set()
+        try:
+            async with session_pool() as session:
+                user_repo = UserRepo(session)
+                if block:
+                    await user_repo.set_blocked(list(block), True)
+                    await SearchQueueRepo(session).remove_many(list(block))
+                if unblock:
+                    await user_repo.set_blocked(list(unblock), False)
+                await session.commit()
+        except BaseException:
+            # Also on cancellation (shutdown). Keep newer changes made while the flush was running
+            self._to_block |= block - self._to_unblock
+            self._to_unblock |= unblock - self._to_block
+            raise
+
+
+reachability = ReachabilityService()
@@ -0,0 +1,78 @@
+import logging
+from datetime import date
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.db.repositories import UserDailyStatRepo
+
+logger = logging.getLogger(__name__)
+
+
+class DailyRollupBuffer:
+    """
+    Write-behind buffer for per-user per-day counters.
+
+    The rating and relay paths only bump in-memory counters; a background task
+    flushes them as one multi-row upsert, so windowed tops never have to scan
+    `ratings` or `message_logs`.
+    """
+
+    def __init__(self):
+        # {(day, telegram_id): [likes, dislikes, messages]}
+        self._pending: dict[tuple[date, int], list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _counters(self, telegram_id: int) -> list[int]:
+        key = (date.today(), telegram_id)
+        counters = self._pending.get(key)
+        if counters is None:
+            counters = self._pending[key] = [0, 0, 0]
+        return counters
+
+    def add_karma(self, telegram_id: int, is_like: bool) -> None:
+        self._counters(telegram_id)[0 if is_like else 1] += 1
+
+    def add_message(self, telegram_id: int, count: int = 1) -> None:
+        self._counters(telegram_id)[2] += count
+
+    def drain(self) -> list[dict]:
+        pending, self._pending = self._pending, {}
+        return [
+            {
+                "telegram_id": telegram_id,
+                "day": day,
+                "karma_likes": likes,
+                "karma_dislikes": dislikes,
+                "messages_count": messages,
+            }
+            for (day, telegram_id), (likes, dislikes, messages) in pending.items()
+        ]
+
+    def restore(self, rows: list[dict]) -> None:
+        """Merge rows of a failed flush back so they go out with the next one."""
+        for row in rows:
+            key = (row["day"], row["telegram_id"])
+            counters = self._pending.setdefault(key, [0, 0, 0])
+            counters[0] += row["karma_likes"]
+            counters[1] += row["karma_dislikes"]
+            counters[2] += row["messages_count"]
+
+    async def flush(self, session_pool: async_sessionmaker[AsyncSession]) -> int:
+        """Write all pending counters. Returns number of rows written."""
+        rows = self.drain()
+        if not rows:
+            return 0
+        try:
+            async with session_pool() as session:
+                await UserDailyStatRepo(session).add_many(rows)
+                await session.commit()
+        except BaseException:
+            # Also on cancellation, so a flush cut short at shutdown is retried by the final one
+            self.restore(rows)
+            raise
+        return len(rows)
+
+
+rollups = DailyRollupBuffer()
@@ -0,0 +1,120 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+
+from aiogram import Bot
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.db.repositories import UserRepo
+from bot.services.leaderboard import leaderboard
+from bot.services.reachability import reachability
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for a single sleep, so wall-clock jumps are picked up quickly.
+MAX_SLEEP_SECONDS = 300
+RETRY_SECONDS = 30
+
+
+class VipExpiryScheduler:
+    """
+    Expires VIP subscriptions exactly at `vip_until`.
+
+    Deadlines live in a min-heap loaded at startup and fed by `schedule()`
+    whenever VIP is activated or extended. Superseded heap items are skipped
+    lazily, `_due` holds the current deadline per user.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int]] = []
+        self._due: dict[int, datetime] = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, telegram_id: int, until: datetime) -> None:
+        self._due[telegram_id] = until
+        heapq.heappush(self._heap, (until, telegram_id))
+        if self._heap[0] == (until, telegram_id):
+            self._wakeup.set()
+
+    async def load(self, session: AsyncSession) -> int:
+        """(Re)load all active VIP deadlines from the DB. Returns their count."""
+        vips = await UserRepo(session).get_active_vips()
+        self._due = dict(vips)
+        self._heap = [(until, tid) for tid, until in vips]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+        return len(vips)
+
+    def _next_delay(self) -> float | None:
+        while self._heap:
+            until, tid = self._heap[0]
+            if self._due.get(tid) == until:
+                return (until - datetime.now()).total_seconds()
+            heapq.heappop(self._heap)
+        return None
+
+    def _pop_due(self) -> list[int]:
+        now = datetime.now()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            until, tid = heapq.heappop(self._heap)
+            if self._due.get(tid) == until:
+                del self._due[tid]
+                due.append(tid)
+        return due
+
+    async def run(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        bot: Bot | None = None,
+    ) -> None:
+        """Sleep until the nearest deadline, expire it, repeat. Pass `bot` to notify users."""
+        while True:
+            self._wakeup.clear()
+            delay = self._next_delay()
+            if delay is None or delay > 0:
+                timeout = MAX_SLEEP_SECONDS if delay is None else min(delay, MAX_SLEEP_SECONDS)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            for tid in self._pop_due():
+                try:
+                    await self._expire(session_pool, bot, tid)
+                except Exception as e:
+                    logger.error(f"VIP expiry error for {tid}: {e}")
+                    self.schedule(tid, datetime.now() + timedelta(seconds=RETRY_SECONDS))
+
+    async def _expire(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        bot: Bot | None,
+        telegram_id: int,
+    ) -> None:
+        async with session_pool() as session:
+            expired = await UserRepo(session).expire_vip(telegram_id)
+            await session.commit()
+        if not expired:
+            return
+
+        leaderboard.set_vip(telegram_id, False)
+        logger.info(f"VIP expired for {telegram_id}")
+
+        if bot is not None and not reachability.is_blocked(telegram_id):
+            try:
+                await bot.send_message(
+                    telegram_id,
+                    "⏳ Ваш VIP статус истёк.\n\n"
+                    "👑 Продлить подписку можно в меню «VIP статус 🔥»",
+                )
+            except Exception as e:
+                reachability.on_delivery_error(telegram_id, e)
+
+
+vip_expiry = VipExpiryScheduler()
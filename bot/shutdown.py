@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from typing import Coroutine
+
+logger = logging.getLogger(__name__)
+
+# Budget for everything after the drains: cancelling tasks, flushing buffers, closing
+FLUSH_TIMEOUT = 10
+
+
+class ShutdownSequence:
+    """
+    Runs shutdown steps one after another against a shared deadline and times each.
+
+    Steps share the time left until the current deadline instead of each
+    getting its own, so the whole shutdown stays within a known bound
+    (drain deadline + FLUSH_TIMEOUT). A failing or overrunning step is
+    logged and skipped, never aborting the steps after it: a stuck drain
+    must not stop buffers from being flushed or the engine from being disposed.
+    """
+
+    def __init__(self):
+        self.started: float | None = None
+        self.deadline = 0.0
+        self.steps: list[tuple[str, float, str]] = []
+
+    def begin(self, drain_timeout: float = 0) -> None:
+        """
+        Start the clock as soon as updates stop being accepted: the drains
+        share `drain_timeout` from here. Only the first call counts.
+        """
+        if self.started is None:
+            self.started = time.perf_counter()
+            self.deadline = self.started + drain_timeout
+
+    def set_deadline(self, seconds: float) -> None:
+        """Steps from now on share `seconds`, counted from now."""
+        self.deadline = time.perf_counter() + seconds
+
+    def remaining(self) -> float:
+        return max(self.deadline - time.perf_counter(), 0.0)
+
+    async def step(self, name: str, action: Coroutine, timeout: float | None = None) -> None:
+        """Run `action` within the time left, or within `timeout` if given."""
+        started = time.perf_counter()
+        if timeout is None:
+            timeout = self.remaining()
+        outcome = "ok"
+        if timeout <= 0:
+            action.close()
+            outcome = "skipped: deadline passed"
+            logger.warning(f"Shutdown step {name!r} skipped: deadline passed")
+        else:
+            try:
+                await asyncio.wait_for(action, timeout)
+            except asyncio.TimeoutError:
+                outcome = f"timed out after {timeout:.1f}s"
+                logger.warning(f"Shutdown step {name!r} timed out after {timeout:.1f}s")
+            except Exception as e:
+                outcome = f"failed: {e}"
+                logger.error(f"Shutdown step {name!r} failed: {e}")
+        self.steps.append((name, time.perf_counter() - started, outcome))
+
+    def report(self) -> str:
+        total = time.perf_counter() - (self.started or time.perf_counter())
+        lines = [f"Shutdown took {total:.2f}s:"]
+        for name, seconds, outcome in self.steps:
+            lines.append(f"  {name:<24} {seconds * 1000:>8.0f} ms  {outcome}")
+        return "\n".join(lines)
+
+
+async def cancel_tasks(tasks: list[asyncio.Task]) -> None:
+    """Cancel background tasks and wait until they have actually stopped."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from bot.db.bootstrap import ensure_schema, prewarm_pool
+from bot.db.repositories import UserRepo
+from bot.services.catalog import catalog
+from bot.services.leaderboard import leaderboard
+from bot.services.reachability import reachability
+from bot.services.vip_expiry import vip_expiry
+from bot.startup_timeline import timeline
+
+logger = logging.getLogger(__name__)
+
+
+async def _load_vip_and_top(session_pool: async_sessionmaker[AsyncSession]) -> None:
+    async with session_pool() as session:
+        # Catch up on subscriptions that ran out while the bot was down,
+        # then expire the rest exactly on time.
+        expired = await UserRepo(session).deactivate_expired_vip()
+        await session.commit()
+        if expired:
+            logger.info(f"Deactivated {expired} expired VIP subscription(s)")
+        await vip_expiry.load(session)
+        # After the catch-up, so /top shows no stale VIP badges
+        await leaderboard.refresh(session)
+
+
+async def _load_catalog(session_pool: async_sessionmaker[AsyncSession]) -> None:
+    async with session_pool() as session:
+        await catalog.reload(session)
+
+
+async def _load_reachability(session_pool: async_sessionmaker[AsyncSession]) -> None:
+    async with session_pool() as session:
+        blocked = await reachability.load(session)
+    if blocked:
+        logger.info(f"{blocked} user(s) flagged as unreachable")
+
+
+async def _prewarm(engine: AsyncEngine, connections: int) -> None:
+    try:
+        await prewarm_pool(engine, connections)
+    except Exception as e:
+        # Only an optimization: the pool connects on demand anyway
+        logger.warning(f"Pool prewarm failed: {e}")
+
+
+async def prepare(
+    engine: AsyncEngine,
+    session_pool: async_sessionmaker[AsyncSession],
+    prewarm_connections: int = 5,
+) -> None:
+    """Schema/seed check, then the caches and the pool warmed up concurrently."""
+    await ensure_schema(engine, session_pool)
+    await asyncio.gather(
+        _load_vip_and_top(session_pool),
+        _load_catalog(session_pool),
+        _load_reachability(session_pool),
+        _prewarm(engine, prewarm_connections),
+    )
+    timeline.mark("caches + pool prewarm")
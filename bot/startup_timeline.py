@@ -0,0 +1,121 @@
+"""
+Startup phase timeline.
+
+bot.main imports this module first, so `timeline` starts counting before
+aiogram, SQLAlchemy and the handlers are imported. Each `mark(phase)` closes
+the phase that ran since the previous mark. With STARTUP_PROFILE=1 the bot
+logs the whole timeline once the first update is handled, followed by
+per-module import times measured in a fresh interpreter (`-X importtime`).
+"""
+import asyncio
+import logging
+import os
+import re
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+# Read from the environment directly: the timeline starts before config is loaded
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0") == "1"
+
+logger = logging.getLogger(__name__)
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(output: str) -> list[tuple[str, int, int]]:
+    """`-X importtime` stderr -> [(module, self µs, cumulative µs)] in import order."""
+    rows = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return rows
+
+
+def group_by_package(rows: list[tuple[str, int, int]]) -> dict[str, int]:
+    """Self time per top-level package (bot.* split by subpackage)."""
+    totals: dict[str, int] = {}
+    for module, self_us, _ in rows:
+        parts = module.split(".")
+        group = ".".join(parts[:2]) if parts[0] == "bot" else parts[0]
+        totals[group] = totals.get(group, 0) + self_us
+    return totals
+
+
+async def measure_imports(module: str = "bot.main") -> list[tuple[str, int, int]]:
+    """Import `module` in a fresh interpreter with -X importtime and parse the result."""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-X", "importtime", "-c", f"import {module}",
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    return parse_importtime(stderr.decode(errors="replace"))
+
+
+def import_report(rows: list[tuple[str, int, int]], top: int = 15) -> str:
+    total = sum(self_us for _, self_us, _ in rows)
+    lines = [f"Imports: {total / 1000:.0f} ms in {len(rows)} modules", "By package (self ms):"]
+    packages = sorted(group_by_package(rows).items(), key=lambda item: item[1], reverse=True)
+    for name, self_us in packages[:top]:
+        lines.append(f"  {name:<30} {self_us / 1000:>8.1f}")
+    lines.append("Slowest modules (self ms / cumulative ms):")
+    for module, self_us, cumulative_us in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        lines.append(f"  {module:<45} {self_us / 1000:>8.1f} {cumulative_us / 1000:>8.1f}")
+    return "\n".join(lines)
+
+
+class StartupTimeline:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: list[tuple[str, float]] = []
+        self.first_update_seen = False
+        self._report_task: asyncio.Task | None = None
+
+    def mark(self, phase: str) -> None:
+        """Close `phase`: it lasted from the previous mark until now."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def elapsed(self) -> float:
+        return self._last - self.started
+
+    def report(self) -> str:
+        lines = [f"Startup timeline ({self.elapsed * 1000:.0f} ms):"]
+        cumulative = 0.0
+        for phase, seconds in self.phases:
+            cumulative += seconds
+            share = seconds / self.elapsed * 100 if self.elapsed else 0
+            lines.append(
+                f"  {phase:<28} {seconds * 1000:>8.1f} ms {share:>5.1f}%  (at {cumulative * 1000:.0f} ms)"
+            )
+        return "\n".join(lines)
+
+    async def middleware(
+        self,
+        handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: Dict[str, Any],
+    ) -> Any:
+        """Outer `update` middleware for profiling mode: closes the timeline on the first update."""
+        try:
+            return await handler(event, data)
+        finally:
+            if not self.first_update_seen:
+                self.first_update_seen = True
+                self.mark("until first update handled")
+                self._report_task = asyncio.create_task(self._log_report())
+
+    async def _log_report(self) -> None:
+        logger.info(self.report())
+        try:
+            logger.info(import_report(await measure_imports()))
+        except Exception as e:
+            logger.warning(f"Import profiling failed: {e}")
+
+
+timeline = StartupTimeline()
@@ -0,0 +1,188 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.config import Config
+from bot.db.repositories import FsmRecordRepo
+from bot.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_memory_entries = registry.gauge("fsm_memory_entries", "Keys held by the in-memory FSM storage")
+_memory_evictions = registry.counter(
+    "fsm_memory_evictions_total", "Keys dropped by the in-memory FSM storage", ("reason",)
+)
+
+
+@dataclass(slots=True)
+class _Record:
+    state: str | None = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    expires_at: float = 0.0
+
+
+class TTLMemoryStorage(BaseStorage):
+    """
+    In-process FSM storage with bounded memory.
+
+    Like aiogram's MemoryStorage, but a key is forgotten `ttl` after its last
+    write, at most `max_size` keys are held (least recently used go first),
+    and cleared keys (no state, no data) are dropped instead of kept forever.
+    """
+
+    def __init__(self, ttl: timedelta = timedelta(days=1), max_size: int = 100_000):
+        self.ttl = ttl.total_seconds()
+        self.max_size = max_size
+        self._records: OrderedDict[StorageKey, _Record] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _get(self, key: StorageKey) -> _Record | None:
+        record = self._records.get(key)
+        if record is None:
+            return None
+        if record.expires_at <= time.monotonic():
+            del self._records[key]
+            _memory_evictions.inc(reason="ttl")
+            _memory_entries.set(len(self._records))
+            return None
+        self._records.move_to_end(key)
+        return record
+
+    def _write(self, key: StorageKey) -> _Record:
+        record = self._get(key)
+        if record is None:
+            record = self._records[key] = _Record()
+            while len(self._records) > self.max_size:
+                self._records.popitem(last=False)
+                _memory_evictions.inc(reason="size")
+            _memory_entries.set(len(self._records))
+        record.expires_at = time.monotonic() + self.ttl
+        return record
+
+    def _drop_if_empty(self, key: StorageKey, record: _Record) -> None:
+        if record.state is None and not record.data:
+            self._records.pop(key, None)
+            _memory_entries.set(len(self._records))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = self._write(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._drop_if_empty(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self._get(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = self._write(key)
+        record.data = data.copy()
+        self._drop_if_empty(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self._get(key)
+        return record.data.copy() if record else {}
+
+    async def cleanup(self) -> int:
+        """Drop every expired key. Returns their count."""
+        now = time.monotonic()
+        expired = [key for key, record in self._records.items() if record.expires_at <= now]
+        for key in expired:
+            del self._records[key]
+        if expired:
+            _memory_evictions.inc(len(expired), reason="ttl")
+        _memory_entries.set(len(self._records))
+        return len(expired)
+
+    async def close(self) -> None:
+        self._records.clear()
+
+
+class MySQLStorage(BaseStorage):
+    """
+    FSM storage in the `fsm_records` table, shared by every bot process.
+
+    Each chat/user is one row keyed like aiogram's Redis keys. Every write
+    pushes `expires_at` forward by `ttl`, so a flow abandoned half-way is
+    forgotten after `ttl` and removed by `cleanup()`. Uses its own short
+    sessions — the handler's session may be mid-transaction or rolled back.
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        ttl: timedelta = timedelta(days=1),
+    ):
+        self.session_pool = session_pool
+        self.ttl = ttl
+        self.key_builder = DefaultKeyBuilder(with_destiny=True)
+
+    def _expires_at(self) -> datetime:
+        return datetime.now() + self.ttl
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        if isinstance(state, State):
+            state = state.state
+        async with self.session_pool() as session:
+            await FsmRecordRepo(session).set_state(
+                self.key_builder.build(key), state, self._expires_at()
+            )
+            await session.commit()
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        async with self.session_pool() as session:
+            record = await FsmRecordRepo(session).get(self.key_builder.build(key))
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        async with self.session_pool() as session:
+            await FsmRecordRepo(session).set_data(
+                self.key_builder.build(key), json.dumps(data), self._expires_at()
+            )
+            await session.commit()
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        async with self.session_pool() as session:
+            record = await FsmRecordRepo(session).get(self.key_builder.build(key))
+        return json.loads(record.data) if record else {}
+
+    async def cleanup(self) -> int:
+        """Delete expired rows. Returns their count."""
+        async with self.session_pool() as session:
+            deleted = await FsmRecordRepo(session).delete_expired()
+            await session.commit()
+        return deleted
+
+    async def close(self) -> None:
+        pass
+
+
+def create_storage(config: Config, session_pool: async_sessionmaker[AsyncSession]) -> BaseStorage:
+    """FSM storage selected by FSM_STORAGE: memory (single process), mysql or redis."""
+    backend = config.fsm.backend
+    ttl = timedelta(seconds=config.fsm.ttl)
+    if backend == "mysql":
+        return MySQLStorage(session_pool, ttl=ttl)
+    if backend == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as e:
+            raise RuntimeError("FSM_STORAGE=redis needs the redis package: pip install redis") from e
+        return RedisStorage.from_url(
+            config.redis.url,
+            key_builder=DefaultKeyBuilder(with_destiny=True),
+            state_ttl=ttl,
+            data_ttl=ttl,
+        )
+    if backend != "memory":
+        logger.warning(f"Unknown FSM_STORAGE={backend!r}, using memory")
+    return TTLMemoryStorage(ttl=ttl, max_size=config.fsm.max_size)
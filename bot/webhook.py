@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import signal
+from typing import Any, Callable
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from bot.config import WebhookConfig
+from bot.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# How long shutdown waits for updates that are still being handled
+DRAIN_TIMEOUT = 10
+
+_in_flight = registry.gauge("webhook_updates_in_flight", "Webhook updates being handled")
+_received = registry.counter("webhook_updates_total", "Webhook updates accepted")
+
+
+def check_config(config: WebhookConfig) -> None:
+    """
+    Refuse to serve webhooks without a secret token: without it anyone who finds
+    the URL can POST forged updates, e.g. admin commands with an admin's user id.
+    """
+    if not config.secret:
+        raise RuntimeError(
+            "WEBHOOK_SECRET is required with BOT_MODE=webhook: "
+            "set it to a random string, e.g. `openssl rand -hex 32`"
+        )
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Feeds webhook updates to the dispatcher concurrently, at most `max_in_flight` at once.
+
+    Telegram gets its 200 only after a slot is free, so a burst backs up on
+    Telegram's side (bounded by setWebhook max_connections) instead of piling
+    up tasks here. On close it waits for in-flight updates instead of
+    closing the bot session — main() owns that.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        max_in_flight: int = 100,
+        drain_timeout: float = DRAIN_TIMEOUT,
+        **kwargs: Any,
+    ):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.drain_timeout = drain_timeout
+
+    async def _background_feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        try:
+            await super()._background_feed_update(bot, update)
+        except Exception:
+            logger.exception("Webhook update failed")
+        finally:
+            _in_flight.dec()
+            self._slots.release()
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        await self._slots.acquire()
+        _in_flight.inc()
+        _received.inc()
+        try:
+            return await super()._handle_request_background(bot, request)
+        except Exception:
+            # Body was not valid JSON: no task was started to free the slot
+            _in_flight.dec()
+            self._slots.release()
+            return web.Response(status=400)
+
+    async def close(self) -> None:
+        tasks = list(self._background_feed_update_tasks)
+        if tasks:
+            logger.info(f"Waiting for {len(tasks)} webhook update(s) to finish")
+            await asyncio.wait(tasks, timeout=self.drain_timeout)
+
+
+async def run_webhook(
+    dp: Dispatcher,
+    bot: Bot,
+    config: WebhookConfig,
+    allowed_updates: list[str],
+    drain_timeout: float = DRAIN_TIMEOUT,
+    on_stop: Callable[[], None] | None = None,
+) -> None:
+    """
+    Serve updates over HTTP until SIGINT/SIGTERM. Registers the webhook if `config.url` is set.
+
+    `on_stop` is called as soon as the signal arrives, before updates in
+    flight are drained (up to `drain_timeout`).
+    """
+    check_config(config)
+    app = web.Application()
+    handler = BoundedRequestHandler(
+        dp,
+        bot,
+        max_in_flight=config.max_in_flight,
+        drain_timeout=drain_timeout,
+        secret_token=config.secret,
+    )
+    handler.register(app, path=config.path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, config.host, config.port)
+    await site.start()
+    logger.info(f"Webhook server listening on {config.host}:{config.port}{config.path}")
+
+    if config.url:
+        await bot.set_webhook(
+            config.url.rstrip("/") + config.path,
+            secret_token=config.secret,
+            allowed_updates=allowed_updates,
+            max_connections=config.max_connections,
+        )
+        logger.info(f"Webhook set to {config.url.rstrip('/')}{config.path}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        if on_stop is not None:
+            on_stop()
+        logger.info("Webhook server stopping...")
+        if config.url:
+            try:
+                # Keep pending updates: Telegram queues them until the next start
+                await bot.delete_webhook(drop_pending_updates=False)
+            except Exception as e:
+                logger.error(f"Webhook delete error: {e}")
+        await runner.cleanup()
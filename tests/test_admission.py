@@ -0,0 +1,52 @@
+"""AdmissionController: weights clamped to capacity are given back exactly, across resize()."""
+import asyncio
+
+from bot.services.admission import AdmissionController, Priority
+
+
+def test_release_returns_the_acquired_weight_after_resize():
+    async def main():
+        controller = AdmissionController(4)
+        granted = await controller.acquire(weight=10)
+        assert granted == 4
+        controller.resize(8)
+        controller.release(granted)
+        assert controller._in_use == 0
+
+        async with controller.slot(weight=10):
+            assert controller._in_use == 8
+            controller.resize(2)
+        assert controller._in_use == 0
+
+    asyncio.run(main())
+
+
+def test_waiters_are_served_by_priority():
+    async def main():
+        controller = AdmissionController(1)
+        granted = await controller.acquire()
+        order: list[str] = []
+
+        async def waiter(name: str, priority: Priority):
+            async with controller.slot(priority):
+                order.append(name)
+
+        tasks = [
+            asyncio.create_task(waiter("low", Priority.LOW)),
+            asyncio.create_task(waiter("high", Priority.HIGH)),
+        ]
+        await asyncio.sleep(0.01)
+        controller.release(granted)
+        await asyncio.gather(*tasks)
+        assert order == ["high", "low"]
+
+    asyncio.run(main())
+
+
+def test_acquire_gives_up_after_timeout():
+    async def main():
+        controller = AdmissionController(1)
+        await controller.acquire()
+        assert await controller.acquire(timeout=0.01) == 0
+
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""MediaGroupCollector: debounce, the 10-part and max_age flushes, eviction and drain."""
+import asyncio
+
+from aiogram.types import Message
+
+from bot.services.media_group import MAX_GROUP_SIZE, MediaGroupCollector
+
+
+def _part(message_id: int, group: str = "g1", chat_id: int = 42) -> Message:
+    return Message.model_validate({
+        "message_id": message_id,
+        "date": 1760875200,
+        "chat": {"id": chat_id, "type": "private"},
+        "media_group_id": group,
+        "photo": [{"file_id": f"p{message_id}", "file_unique_id": f"u{message_id}", "width": 1, "height": 1}],
+    })
+
+
+class _Session:
+    def __init__(self):
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        self.committed = True
+
+    async def rollback(self):
+        pass
+
+
+class _Albums:
+    """Handler recording each album it is given, as message ids."""
+
+    def __init__(self, hold: float = 0):
+        self.received: list[list[int]] = []
+        self.hold = hold
+
+    async def __call__(self, messages: list[Message], session: _Session) -> None:
+        await asyncio.sleep(self.hold)
+        self.received.append([m.message_id for m in messages])
+
+
+def test_parts_are_debounced_into_one_album():
+    async def main():
+        albums = _Albums()
+        collector = MediaGroupCollector(_Session, delay=0.1)
+        for message_id in (3, 1, 2):
+            collector.add(_part(message_id), albums)
+            await asyncio.sleep(0.05)
+        # Each part re-armed the timer: nothing flushed yet
+        assert albums.received == [] and len(collector) == 1
+        await asyncio.sleep(0.15)
+        assert albums.received == [[1, 2, 3]]
+        assert len(collector) == 0
+
+    asyncio.run(main())
+
+
+def test_full_album_is_flushed_at_once():
+    async def main():
+        albums = _Albums()
+        collector = MediaGroupCollector(_Session, delay=10)
+        for message_id in range(MAX_GROUP_SIZE):
+            collector.add(_part(message_id), albums)
+        assert len(collector) == 0
+        await asyncio.sleep(0.01)
+        assert albums.received == [list(range(MAX_GROUP_SIZE))]
+
+    asyncio.run(main())
+
+
+def test_group_is_flushed_after_max_age():
+    async def main():
+        albums = _Albums()
+        collector = MediaGroupCollector(_Session, delay=0.1, max_age=0.25)
+        # A part every 0.05s would keep re-arming the debounce forever
+        for message_id in range(8):
+            collector.add(_part(message_id), albums)
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.15)
+        assert len(albums.received) == 2
+        assert albums.received[0][0] == 0 and len(albums.received[0]) < 8
+        assert sum(albums.received, []) == list(range(8))
+
+    asyncio.run(main())
+
+
+def test_oldest_group_is_evicted():
+    async def main():
+        albums = _Albums()
+        collector = MediaGroupCollector(_Session, delay=10, max_groups=2)
+        collector.add(_part(1, group="a"), albums)
+        collector.add(_part(2, group="b"), albums)
+        collector.add(_part(3, group="c"), albums)
+        assert len(collector) == 2
+        await collector.drain(1)
+        assert sorted(albums.received) == [[2], [3]]
+
+    asyncio.run(main())
+
+
+def test_drain_flushes_pending_groups_and_waits():
+    async def main():
+        albums = _Albums(hold=0.05)
+        collector = MediaGroupCollector(_Session, delay=10)
+        collector.add(_part(1, group="a"), albums)
+        collector.add(_part(2, group="b", chat_id=43), albums)
+        assert await collector.drain(1) == 0
+        assert sorted(albums.received) == [[1], [2]]
+        assert len(collector) == 0
+
+        slow = _Albums(hold=1)
+        collector.add(_part(3, group="c"), slow)
+        # Gives up after the timeout and reports what is still running
+        assert await collector.drain(0.05) == 1
+
+    asyncio.run(main())
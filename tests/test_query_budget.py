@@ -0,0 +1,119 @@
+"""
+Query budgets: QueryProfile/QueryReport accounting, and statement counts of
+service calls measured with track_queries() on an in-memory SQLite database.
+"""
+import asyncio
+import logging
+
+import pytest
+
+from bot.db import profiling
+from bot.db.profiling import QueryReport, track_queries
+
+# Statements ChatService.start_search may run without and with a partner waiting:
+# active chat check, queue check, up to 3 relaxing match queries, insert, queue size /
+# 2 queue deletes, chat insert, 2 counter updates, both profiles with interests
+START_SEARCH_BUDGET = 7
+START_SEARCH_MATCH_BUDGET = 12
+
+
+def _run_statements(*calls: tuple[str, tuple]) -> profiling.QueryProfile:
+    with track_queries("test") as profile:
+        for key, parameters in calls:
+            profiling.record(key, f"SELECT {key}", parameters, 0.001)
+    return profile
+
+
+def test_record_outside_profile_is_ignored():
+    profiling.record("a", "SELECT a", (1,), 0.001)
+    assert profiling.current_profile() is None
+
+
+def test_duplicates_counts_identical_repeats():
+    profile = _run_statements(("a", (1,)), ("a", (1,)), ("a", (1,)), ("a", (2,)), ("b", (1,)))
+    assert profile.statements == 5
+    assert profile.duplicates() == {"a": 2}
+
+
+def test_repeated_counts_distinct_parameter_sets():
+    profile = _run_statements(("a", (1,)), ("a", (2,)), ("a", (3,)), ("a", (3,)), ("b", (1,)), ("b", (2,)))
+    assert profile.repeated(3) == {"a": 3}
+    assert profile.repeated(2) == {"a": 3, "b": 2}
+
+
+def test_report_warns_over_budget(caplog):
+    report = QueryReport(budget=3, repeat_threshold=10)
+    with caplog.at_level(logging.WARNING, logger="bot.db.profiling"):
+        report.add(_run_statements(("a", (1,)), ("b", (1,)), ("c", (1,))))
+        assert not caplog.records
+        report.add(_run_statements(("a", (1,)), ("b", (1,)), ("c", (1,)), ("d", (1,))))
+    assert [r.getMessage() for r in caplog.records] == ["test: 4 statements (budget 3), 4 ms in DB"]
+    assert "test: 2, 3.5/4" in report.summary()
+
+
+def test_report_warns_on_duplicates_and_n_plus_one(caplog):
+    report = QueryReport(budget=100, repeat_threshold=3)
+    with caplog.at_level(logging.WARNING, logger="bot.db.profiling"):
+        report.add(_run_statements(("a", (1,)), ("a", (1,)), ("b", (1,)), ("b", (2,)), ("b", (3,))))
+    messages = [r.getMessage() for r in caplog.records]
+    assert any("identical statement repeated 1x [a]" in m for m in messages)
+    assert any("possible N+1, run with 3 parameter sets [b]" in m for m in messages)
+
+
+# ─── Service budgets (SQLite) ───
+
+
+class _Bot:
+    """Records outgoing messages instead of calling Telegram."""
+
+    def __init__(self):
+        self.sent: list[tuple[int, str]] = []
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+def _count_start_search(with_partner: bool) -> tuple[int, str]:
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import StaticPool
+
+    from bot.db.engine import Base, create_session_pool
+    from bot.db.instrumentation import instrument
+    from bot.db.models import User
+    from bot.db.repositories import SearchQueueRepo
+    from bot.services.chat import ChatService
+
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        instrument(engine.sync_engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_pool = create_session_pool(engine)
+        async with session_pool() as session:
+            user = User(telegram_id=1, first_name="A", is_registered=True)
+            partner = User(telegram_id=2, first_name="B", is_registered=True)
+            session.add_all([user, partner])
+            await session.commit()
+            if with_partner:
+                await SearchQueueRepo(session).add_to_queue(partner)
+                await session.commit()
+
+            with track_queries("start_search") as profile:
+                reply = await ChatService(_Bot(), session).start_search(user)
+        await engine.dispose()
+        return profile.statements, reply
+
+    return asyncio.run(main())
+
+
+def test_start_search_queues_within_budget():
+    statements, reply = _count_start_search(with_partner=False)
+    assert reply.startswith("🔍 Ищем собеседника")
+    assert statements <= START_SEARCH_BUDGET
+
+
+def test_start_search_match_within_budget():
+    statements, reply = _count_start_search(with_partner=True)
+    assert reply.startswith("Нашёл кое-кого")
+    assert statements <= START_SEARCH_MATCH_BUDGET
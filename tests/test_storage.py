@@ -0,0 +1,160 @@
+"""
+FSM storage backends: state and data round-trips and TTL expiry.
+
+The memory backend always runs. MySQL and Redis run against local servers
+when TEST_DATABASE_URL (mysql+aiomysql://…) / TEST_REDIS_URL (redis://…)
+are set, e.g. `docker run -p 6379:6379 redis`; otherwise they are skipped.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator, Callable
+
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StorageKey
+
+from bot.storage import MySQLStorage, TTLMemoryStorage
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL", "")
+
+
+class Form(StatesGroup):
+    age = State()
+
+
+@asynccontextmanager
+async def memory_storage(ttl: timedelta) -> AsyncIterator[BaseStorage]:
+    storage = TTLMemoryStorage(ttl=ttl)
+    yield storage
+    await storage.close()
+
+
+@asynccontextmanager
+async def mysql_storage(ttl: timedelta) -> AsyncIterator[BaseStorage]:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from bot.db.models import FsmRecord
+
+    engine = create_async_engine(TEST_DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(FsmRecord.__table__.create, checkfirst=True)
+    try:
+        yield MySQLStorage(async_sessionmaker(engine, expire_on_commit=False), ttl=ttl)
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(FsmRecord.__table__.drop)
+        await engine.dispose()
+
+
+@asynccontextmanager
+async def redis_storage(ttl: timedelta) -> AsyncIterator[BaseStorage]:
+    from aiogram.fsm.storage.redis import RedisStorage
+
+    storage = RedisStorage.from_url(
+        TEST_REDIS_URL,
+        key_builder=DefaultKeyBuilder(with_destiny=True),
+        state_ttl=ttl,
+        data_ttl=ttl,
+    )
+    try:
+        yield storage
+    finally:
+        await storage.redis.flushdb()
+        await storage.close()
+
+
+# (factory, shortest TTL the backend keeps exactly): MySQL DATETIME has whole seconds
+BACKENDS = [
+    pytest.param((memory_storage, 0.2), id="memory"),
+    pytest.param(
+        (mysql_storage, 2),
+        id="mysql",
+        marks=pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set"),
+    ),
+    pytest.param(
+        (redis_storage, 1),
+        id="redis",
+        marks=pytest.mark.skipif(not TEST_REDIS_URL, reason="TEST_REDIS_URL not set"),
+    ),
+]
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+OTHER_KEY = StorageKey(bot_id=1, chat_id=43, user_id=43)
+
+
+def run(factory: Callable, ttl: float, scenario: Callable) -> None:
+    async def main():
+        async with factory(timedelta(seconds=ttl)) as storage:
+            await scenario(storage)
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_state_round_trip(backend):
+    factory, _ = backend
+
+    async def scenario(storage: BaseStorage):
+        assert await storage.get_state(KEY) is None
+        await storage.set_state(KEY, Form.age)
+        assert await storage.get_state(KEY) == Form.age.state
+        assert await storage.get_state(OTHER_KEY) is None
+        await storage.set_state(KEY, None)
+        assert await storage.get_state(KEY) is None
+
+    run(factory, 60, scenario)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_data_round_trip(backend):
+    factory, _ = backend
+
+    async def scenario(storage: BaseStorage):
+        assert await storage.get_data(KEY) == {}
+        await storage.set_data(KEY, {"age": 25, "interests": ["music"]})
+        assert await storage.get_data(KEY) == {"age": 25, "interests": ["music"]}
+        # Returned data is a copy: mutating it does not change the stored one
+        data = await storage.get_data(KEY)
+        data["age"] = 30
+        assert (await storage.get_data(KEY))["age"] == 25
+        await storage.set_state(KEY, Form.age)
+        assert await storage.get_data(KEY) == {"age": 25, "interests": ["music"]}
+        await storage.set_data(KEY, {})
+        assert await storage.get_data(KEY) == {}
+
+    run(factory, 60, scenario)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_ttl_expiry(backend):
+    factory, ttl = backend
+
+    async def scenario(storage: BaseStorage):
+        await storage.set_state(KEY, Form.age)
+        await storage.set_data(KEY, {"age": 25})
+        await asyncio.sleep(ttl * 1.5)
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+        # An expired record's data does not come back with a new state
+        await storage.set_state(KEY, Form.age)
+        assert await storage.get_data(KEY) == {}
+
+    run(factory, ttl, scenario)
+
+
+def test_memory_evicts_least_recently_used():
+    async def scenario():
+        storage = TTLMemoryStorage(max_size=2)
+        keys = [StorageKey(bot_id=1, chat_id=i, user_id=i) for i in range(3)]
+        await storage.set_state(keys[0], Form.age)
+        await storage.set_state(keys[1], Form.age)
+        await storage.get_state(keys[0])  # keys[1] is now the least recently used
+        await storage.set_state(keys[2], Form.age)
+        assert len(storage) == 2
+        assert await storage.get_state(keys[1]) is None
+        assert await storage.get_state(keys[0]) == Form.age.state
+
+    asyncio.run(scenario())
@@ -0,0 +1,196 @@
+"""BoundedRequestHandler fed recorded Telegram updates through aiohttp's test client."""
+import asyncio
+import copy
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.config import WebhookConfig
+from bot.webhook import BoundedRequestHandler, check_config
+
+# As Telegram POSTs it (trimmed to the fields aiogram needs)
+RECORDED_UPDATE = {
+    "update_id": 513447601,
+    "message": {
+        "message_id": 1711,
+        "from": {
+            "id": 287654321,
+            "is_bot": False,
+            "first_name": "Аня",
+            "username": "anya_test",
+            "language_code": "ru",
+        },
+        "chat": {
+            "id": 287654321,
+            "first_name": "Аня",
+            "username": "anya_test",
+            "type": "private",
+        },
+        "date": 1760875200,
+        "text": "Привет!",
+    },
+}
+
+
+def _update(n: int) -> dict:
+    update = copy.deepcopy(RECORDED_UPDATE)
+    update["update_id"] += n
+    update["message"]["message_id"] += n
+    return update
+
+
+class _Harness:
+    """Dispatcher whose only handler blocks on `release` and records what it saw."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.handled: list[str] = []
+        self.running = 0
+        self.max_running = 0
+        self.dp = Dispatcher()
+        router = Router()
+        router.message.register(self.on_message)
+        self.dp.include_router(router)
+
+    async def on_message(self, message: Message) -> None:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await self.release.wait()
+            self.handled.append(message.text)
+        finally:
+            self.running -= 1
+
+
+async def _serve(harness: _Harness, **kwargs) -> tuple[TestClient, BoundedRequestHandler]:
+    bot = Bot("42:TEST")
+    app = web.Application()
+    handler = BoundedRequestHandler(harness.dp, bot, **kwargs)
+    handler.register(app, path="/webhook")
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    return client, handler
+
+
+def test_recorded_update_is_handled():
+    async def main():
+        harness = _Harness()
+        harness.release.set()
+        client, handler = await _serve(harness)
+        try:
+            response = await client.post("/webhook", json=RECORDED_UPDATE)
+            assert response.status == 200
+            await handler.close()
+            assert harness.handled == ["Привет!"]
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+def test_invalid_body_is_rejected_without_leaking_a_slot():
+    async def main():
+        harness = _Harness()
+        harness.release.set()
+        client, handler = await _serve(harness, max_in_flight=1)
+        try:
+            response = await client.post("/webhook", data=b"not json")
+            assert response.status == 400
+            response = await asyncio.wait_for(client.post("/webhook", json=RECORDED_UPDATE), 1)
+            assert response.status == 200
+            await handler.close()
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+def test_in_flight_updates_are_bounded():
+    async def main():
+        harness = _Harness()
+        client, handler = await _serve(harness, max_in_flight=2)
+        try:
+            requests = [asyncio.create_task(client.post("/webhook", json=_update(n))) for n in range(3)]
+            await asyncio.sleep(0.2)
+            # Two are being handled and answered; the third waits for a slot, unanswered
+            assert harness.running == 2
+            assert sum(r.done() for r in requests) == 2
+            harness.release.set()
+            responses = await asyncio.wait_for(asyncio.gather(*requests), 1)
+            assert [r.status for r in responses] == [200, 200, 200]
+            await handler.close()
+            assert len(harness.handled) == 3
+            assert harness.max_running == 2
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+def test_close_drains_in_flight_updates():
+    async def main():
+        harness = _Harness()
+        client, handler = await _serve(harness, drain_timeout=5)
+        try:
+            assert (await client.post("/webhook", json=RECORDED_UPDATE)).status == 200
+            await asyncio.sleep(0.05)
+            asyncio.get_running_loop().call_later(0.1, harness.release.set)
+            await handler.close()
+            # close() returned only once the update was handled
+            assert harness.handled == ["Привет!"]
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+def test_close_gives_up_after_drain_timeout():
+    async def main():
+        harness = _Harness()
+        client, handler = await _serve(harness, drain_timeout=0.1)
+        try:
+            assert (await client.post("/webhook", json=RECORDED_UPDATE)).status == 200
+            await asyncio.sleep(0.05)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await handler.close()
+            assert loop.time() - started < 1
+            assert harness.running == 1 and harness.handled == []
+            harness.release.set()
+            await asyncio.sleep(0.05)
+            assert harness.handled == ["Привет!"]
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+def test_update_without_secret_token_is_rejected():
+    async def main():
+        harness = _Harness()
+        harness.release.set()
+        client, handler = await _serve(harness, secret_token="s3cret")
+        try:
+            response = await client.post("/webhook", json=RECORDED_UPDATE)
+            assert response.status == 401
+            response = await client.post(
+                "/webhook",
+                json=RECORDED_UPDATE,
+                headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"},
+            )
+            assert response.status == 200
+            await handler.close()
+            assert harness.handled == ["Привет!"]
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+def test_webhook_mode_requires_a_secret():
+    with pytest.raises(RuntimeError, match="WEBHOOK_SECRET"):
+        check_config(WebhookConfig(enabled=True))
+    check_config(WebhookConfig(enabled=True, secret="s3cret"))